@@ -1,13 +1,19 @@
-import customtkinter as ctk
-from ui.app_view import AppView
+import multiprocessing
 
-ctk.set_appearance_mode("system")      # "light" | "dark" | "system"
-ctk.set_default_color_theme("blue")    # "blue" | "green" | "dark-blue"
-ctk.deactivate_automatic_dpi_awareness()  # prevent alpha flicker/opacity when moving between monitors
 
 def main():
+    # imported here so "spawn" send workers, which re-import this module
+    # as __mp_main__, do not load the GUI
+    import customtkinter as ctk
+    from ui.app_view import AppView
+
+    ctk.set_appearance_mode("system")      # "light" | "dark" | "system"
+    ctk.set_default_color_theme("blue")    # "blue" | "green" | "dark-blue"
+    ctk.deactivate_automatic_dpi_awareness()  # prevent alpha flicker/opacity when moving between monitors
+
     app = AppView()
     app.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
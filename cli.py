@@ -0,0 +1,140 @@
+"""Headless sender: send experiments without the GUI.
+
+Builds the same payload as the "Send experiment" button from a saved
+preferences file plus command-line overrides, then prints one JSON line per
+folder and stage on stdout, e.g.::
+
+    python cli.py --parent /data/runs --workers 4 | tee -a sends.jsonl
+
+Anything else the send prints (Sacred logs, warnings) goes to stderr so stdout
+stays machine-readable. Secrets are read from SACRED_MONGO_PASSWORD /
+MINIO_SECRET_KEY, or from the keyring when saved there by the GUI.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from services.prefs import CONFIG_PATH, Preferences
+from services.payload import build_payload
+
+
+def _parse_value(raw: str):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send experiment folders to a Sacred MongoDB database.")
+    parser.add_argument("--prefs", default=str(CONFIG_PATH), help="preferences file saved by the GUI (default: %(default)s)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--folder", action="append", default=[], help="experiment folder to send (repeatable)")
+    target.add_argument("--parent", help="send every non-hidden sub-folder of this directory")
+    parser.add_argument("--workers", type=int, help="number of folders sent in parallel")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume the previous batch: skip folders already sent, finish half-sent ones")
+    parser.add_argument("--sync", action="store_true",
+                        help="only send folders whose files changed since their last send")
+    parser.add_argument("--environment", choices=["batch", "per_run", "none"],
+                        help="collect Sacred's git/host/dependency info once per batch, for every run, or not at all")
+    parser.add_argument("--journal", help="checkpoint journal file (default: one per parent folder, for batches of several folders)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a preferences key; VALUE is parsed as JSON when possible")
+    return parser.parse_args(argv)
+
+
+def _load_data(args) -> dict:
+    prefs_path = Path(args.prefs).expanduser()
+    try:
+        data = json.loads(prefs_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Cannot read preferences file {prefs_path}: {e}")
+    for item in args.overrides:
+        key, sep, raw = item.partition("=")
+        if not sep or not key:
+            raise SystemExit(f"Invalid --set value (expected KEY=VALUE): {item}")
+        data[key.strip()] = _parse_value(raw)
+    if args.folder:
+        data["experiment_folders"] = [str(Path(f).expanduser().resolve()) for f in args.folder]
+    elif args.parent:
+        parent = Path(args.parent).expanduser().resolve()
+        data["experiment_folders"] = sorted(
+            (str(d) for d in parent.iterdir() if d.is_dir() and not d.name.startswith(".")),
+            key=lambda n: n.lower(),
+        )
+    if args.workers is not None:
+        data["send_workers"] = args.workers
+    if args.resume:
+        data["send_resume"] = 1
+    if args.sync:
+        data["send_sync"] = 1
+    if args.environment:
+        data["send_environment"] = args.environment
+    if args.journal:
+        data["send_journal"] = args.journal
+    return data
+
+
+def _secrets(data: dict) -> tuple[str, str]:
+    prefs = Preferences()
+    password = os.environ.get("SACRED_MONGO_PASSWORD")
+    if password is None and data.get("remember_pwd"):
+        password = prefs.load_password_if_any(user=data.get("user") or "default")
+    secret = os.environ.get("MINIO_SECRET_KEY")
+    if secret is None and data.get("remember_minio"):
+        key = f"minio:{(data.get('minio_access_key') or 'default')}@{(data.get('minio_endpoint') or 'localhost')}"
+        secret = prefs.load_password_if_any(user=key)
+    return password or "", secret or ""
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    data = _load_data(args)
+    password, secret = _secrets(data)
+    payload = build_payload(data, password=password, minio_secret=secret)
+
+    # Keep a private handle on the real stdout for the JSON lines and point
+    # fd 1 at stderr, so prints from this process and from spawned workers
+    # cannot interleave with the progress stream.
+    sys.stdout.flush()
+    out = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    started = time.monotonic()
+    # pipeline threads report concurrently; one lock keeps lines whole
+    write_lock = threading.Lock()
+
+    def progress(event: dict):
+        line = {
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "elapsed": round(time.monotonic() - started, 3),
+        }
+        line.update(event)
+        text = json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        with write_lock:
+            out.write(text)
+            out.flush()
+
+    # Imported late: pulls in Sacred/pandas, and never customtkinter.
+    from services.experiment_sender import send_experiment
+
+    try:
+        res = send_experiment(payload, progress=progress)
+    except Exception as e:
+        progress({"folder": "", "stage": "batch_failed", "ok": False, "message": f"{e.__class__.__name__}: {e}"})
+        return 1
+    finally:
+        with write_lock:
+            out.flush()
+    if not res.get("ok") and res.get("message"):
+        print(res["message"], file=sys.stderr)
+    return 0 if res.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
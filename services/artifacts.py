@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from services.raw_data_saver import DEFAULT_UPLOAD_WORKERS, MinioSession, save_files_to_minio
+
+POINTER_SUFFIX = ".minio.json"
+POINTER_CONTENT_TYPE = "application/vnd.minio-pointer+json"
+
+# fs.files collections already given the sha256 index in this process
+_INDEXED_FILES = set()
+
+
+def _files_collection(observer):
+    files = observer.runs.database["fs.files"]
+    key = (id(observer.runs.database.client), files.full_name)
+    if key not in _INDEXED_FILES:
+        files.create_index("metadata.sha256", sparse=True)
+        _INDEXED_FILES.add(key)
+    return files
+
+
+def _add_by_content(run, observer, src: str, name: str, entry: Dict[str, Any]) -> bool:
+    """Reference an existing GridFS file with the same content; False if none.
+
+    New files are tagged with their sha256 so later runs can reuse them,
+    and ``metadata.runs`` lists the ids of every run referencing the file.
+    The file is shared: deleting one run's artifacts (e.g. from Omniboard)
+    removes it for all the runs in that list, so check it before deleting.
+    """
+    files = _files_collection(observer)
+    run_id = observer.run_entry["_id"]
+    existing = files.find_one({"metadata.sha256": entry["sha256"], "length": entry["size"]}, {"_id": 1})
+    if existing is None:
+        run.add_artifact(src, name=name, metadata={"sha256": entry["sha256"], "runs": [run_id]})
+        return False
+    files.update_one({"_id": existing["_id"]}, {"$addToSet": {"metadata.runs": run_id}})
+    observer.run_entry.setdefault("artifacts", []).append({"name": name, "file_id": existing["_id"]})
+    observer.save()
+    return True
+
+
+def _add_pointer(run, name: str, pointer: Dict[str, Any]) -> None:
+    """Register a small JSON artifact standing for an object stored in MinIO."""
+    fd, path = tempfile.mkstemp(suffix=POINTER_SUFFIX)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(pointer, f, indent=1)
+        # MongoObserver stores the file in GridFS before add_artifact returns
+        run.add_artifact(path, name=name + POINTER_SUFFIX, metadata=pointer, content_type=POINTER_CONTENT_TYPE)
+    finally:
+        os.unlink(path)
+
+
+def add_artifacts(
+    run,
+    arts: Dict[str, Any],
+    options: Dict[str, Any],
+    minio_payload: Dict[str, Any],
+    session: Optional[MinioSession] = None,
+    manifest: Optional[Dict[str, Dict[str, Any]]] = None,
+    observer=None,
+) -> Dict[str, Any]:
+    """Add the ``format_raw_data`` output of the artifacts selector to ``run``.
+
+    Files of at least ``options["minio_threshold_mb"]`` MB (0 disables the
+    routing) are uploaded to MinIO under ``artifacts/`` and represented in
+    the run by a ``<name>.minio.json`` pointer artifact; smaller files go to
+    GridFS as before. A failed upload falls back to GridFS.
+
+    With ``options["content_addressed"]`` and the run's Mongo ``observer``,
+    a GridFS artifact whose sha256 (from ``manifest``) is already stored is
+    referenced instead of uploaded again; see ``_add_by_content`` for what
+    that means when runs are deleted.
+
+    Returns the ``dataFiles`` entries: ``artifacts`` ({minio_folder: name})
+    and, when used, ``artifacts_minio`` (a list of pointers, each with the
+    artifact's ``name``) and ``artifacts_reused`` (names of the reused
+    files). Lists rather than dicts keyed by file name: Mongo does not
+    accept the dots of ``model.pt`` in field names.
+    """
+    content_addressed = bool(options.get("content_addressed", 0)) and observer is not None and manifest is not None
+    reused = []
+    threshold_mb = float(options.get("minio_threshold_mb", 0) or 0)
+    threshold = int(threshold_mb * 1024 * 1024) if threshold_mb > 0 else None
+    config_arts: Dict[str, Any] = {}
+    pointers: List[Dict[str, Any]] = []
+    large: Dict[str, Any] = {}
+
+    for key, a in arts.items():
+        src = a.get('source_path') if isinstance(a, dict) else str(a)
+        name = a.get('new_name') if isinstance(a, dict) else None
+        if not src or not os.path.exists(src):
+            continue
+        size = (manifest or {}).get(src, {}).get("size")
+        if size is None:
+            size = os.path.getsize(src)
+        if threshold is not None and isinstance(a, dict) and size >= threshold:
+            large[key] = dict(a, minio_folder=f"artifacts/{a['minio_folder']}")
+            continue
+        if content_addressed and src in manifest:
+            if _add_by_content(run, observer, src, name or os.path.basename(src), manifest[src]):
+                reused.append(name)
+        else:
+            run.add_artifact(src, name=name)
+        config_arts[a.get('minio_folder') if isinstance(a, dict) else key] = name
+
+    if large:
+        result = save_files_to_minio(
+            large,
+            minio_payload,
+            workers=options.get("upload_workers", DEFAULT_UPLOAD_WORKERS),
+            manifest=manifest,
+            session=session,
+            dedupe=True,
+        )
+        details = {d["file"]: d for d in result.get("details", []) or []}
+        for key, a in large.items():
+            detail = details.get(a['source_path'])
+            folder = a['minio_folder'][len("artifacts/"):]
+            if not detail or not detail.get("ok"):
+                print(f"Artifact {a['new_name']} not uploaded ({(detail or {}).get('error') or result.get('message')}); storing it in GridFS")
+                run.add_artifact(a['source_path'], name=a['new_name'])
+                config_arts[folder] = a['new_name']
+                continue
+            pointer = {
+                "storage": "minio",
+                "bucket": (minio_payload or {}).get("bucket", ""),
+                "key": detail["key"],
+                "size": detail["bytes"],
+            }
+            entry = (manifest or {}).get(a['source_path'])
+            if entry is not None:
+                pointer["sha256"] = entry["sha256"]
+            _add_pointer(run, a['new_name'], pointer)
+            config_arts[folder] = a['new_name'] + POINTER_SUFFIX
+            pointers.append({"name": a['new_name'], **pointer})
+
+    out: Dict[str, Any] = {"artifacts": config_arts}
+    if pointers:
+        out["artifacts_minio"] = pointers
+    if reused:
+        out["artifacts_reused"] = reused
+    return out
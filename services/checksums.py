@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+from services.prefs import STATE_DIR
+
+# Large reads keep the threads inside hashlib (which releases the GIL)
+# rather than in Python-level loop overhead.
+_READ_BYTES = 8 * 1024 * 1024
+DEFAULT_MANIFEST_WORKERS = 4
+CHECKSUM_CACHE_ENTRIES = 100_000
+
+
+def file_checksums(path: str, part_bytes: int) -> Dict[str, str]:
+    """sha256, md5 and S3 multipart ETag of a file, in one read.
+
+    ``etag`` is what S3/MinIO reports for an upload split in ``part_bytes``
+    parts (md5 of the part md5s, suffixed with the part count); files that
+    fit in one part are uploaded with a plain PUT, whose ETag is ``md5``.
+    """
+    sha = hashlib.sha256()
+    md5 = hashlib.md5()
+    part = hashlib.md5()
+    part_digests = []
+    in_part = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(min(_READ_BYTES, part_bytes - in_part))
+            if not block:
+                break
+            sha.update(block)
+            md5.update(block)
+            part.update(block)
+            in_part += len(block)
+            if in_part == part_bytes:
+                part_digests.append(part.digest())
+                part = hashlib.md5()
+                in_part = 0
+    if in_part:
+        part_digests.append(part.digest())
+    etag = f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+    return {"sha256": sha.hexdigest(), "md5": md5.hexdigest(), "etag": etag}
+
+
+class ChecksumCache:
+    """Checksums of local files, reused while size and mtime are unchanged.
+
+    Re-sending an unchanged batch then costs one ``stat`` per file instead
+    of a full read. Safe to use from upload threads. A send batch loads the
+    cache once and saves it when it ends; ``save`` drops entries of files
+    that no longer exist and keeps the ``max_entries`` most recently used.
+    """
+
+    def __init__(self, path=None, max_entries: int = CHECKSUM_CACHE_ENTRIES):
+        self.path = path or STATE_DIR / "checksums.json"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            self.entries: Dict[str, Dict] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, path: str, part_bytes: int, st: Optional[os.stat_result] = None) -> Dict[str, str]:
+        key = os.path.abspath(path)
+        st = st or os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns, part_bytes]
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry.get("stat") == stamp:
+                entry["used"] = time.time()
+                self._dirty = True
+                return entry["sums"]
+        sums = file_checksums(path, part_bytes)
+        with self._lock:
+            self.entries[key] = {"stat": stamp, "sums": sums, "used": time.time()}
+            self._dirty = True
+        return sums
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self.entries = {key: entry for key, entry in self.entries.items() if os.path.exists(key)}
+            if len(self.entries) > self.max_entries:
+                recent = sorted(self.entries.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)
+                self.entries = dict(recent[: self.max_entries])
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+            try:
+                tmp.write_text(json.dumps(self.entries), encoding="utf-8")
+                os.replace(tmp, self.path)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            self._dirty = False
+
+
+def build_manifest(
+    paths: Iterable[str],
+    part_bytes: int,
+    workers: int = DEFAULT_MANIFEST_WORKERS,
+    cache: Optional[ChecksumCache] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Stat and checksum every file once; returns {path: entry}.
+
+    Entries hold ``size``, ``mtime_ns`` and the ``file_checksums`` digests.
+    Files are hashed in parallel threads; ``cache`` (a ``ChecksumCache``)
+    skips files unchanged since a previous manifest. Saving the cache is
+    left to its owner.
+    """
+    paths = list(dict.fromkeys(paths))
+
+    def entry(path: str) -> Dict[str, Any]:
+        st = os.stat(path)
+        sums = cache.get(path, part_bytes, st) if cache is not None else file_checksums(path, part_bytes)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, **sums}
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers or 1)), thread_name_prefix="manifest") as pool:
+        entries = list(pool.map(entry, paths))
+    return dict(zip(paths, entries))
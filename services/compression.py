@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import io
+import zlib
+from typing import Optional, Tuple
+
+try:  # optional; gzip is used when it is missing
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None
+
+CODECS = ("gzip", "zstd")
+EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+# A file is compressed only if its first blocks shrink below this ratio.
+PROBE_BYTES = 1024 * 1024
+PROBE_MAX_RATIO = 0.9
+_READ_BYTES = 1024 * 1024
+
+
+def resolve_codec(codec: Optional[str]) -> Optional[str]:
+    """Codec actually usable for ``codec`` ("" / None / "none" disable compression)."""
+    codec = (codec or "").lower()
+    if codec in ("", "none"):
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec == "zstd" and zstandard is None:
+        return "gzip"
+    return codec
+
+
+def _compressor(codec: str, level: Optional[int]):
+    level = DEFAULT_LEVELS[codec] if level in (None, "") else int(level)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    # wbits=31: gzip container, readable by gunzip / gzip.open
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def worth_compressing(path: str, codec: str, level: Optional[int] = None) -> bool:
+    """Compress the first ``PROBE_BYTES`` of ``path``; True if they shrink enough."""
+    with open(path, "rb") as f:
+        head = f.read(PROBE_BYTES)
+    if len(head) < 4096:
+        return False
+    comp = _compressor(codec, level)
+    out = comp.compress(head) + comp.flush()
+    return len(out) <= PROBE_MAX_RATIO * len(head)
+
+
+class CompressingReader(io.RawIOBase):
+    """Read-only stream yielding the compressed content of a file.
+
+    Compression happens as the consumer reads (e.g. ``upload_fileobj``), so
+    no temporary file is written. ``bytes_out`` counts what was produced.
+    """
+
+    def __init__(self, path: str, codec: str, level: Optional[int] = None):
+        super().__init__()
+        self._src = open(path, "rb")
+        self._comp = _compressor(codec, level)
+        self._buffer = bytearray()
+        self._eof = False
+        self.bytes_out = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self, size: int) -> None:
+        while not self._eof and len(self._buffer) < size:
+            block = self._src.read(_READ_BYTES)
+            if block:
+                self._buffer += self._comp.compress(block)
+            else:
+                self._buffer += self._comp.flush()
+                self._eof = True
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            self._fill(float("inf"))
+            size = len(self._buffer)
+        else:
+            self._fill(size)
+        out = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_out += len(out)
+        return out
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        try:
+            self._src.close()
+        finally:
+            super().close()
+
+
+def plan_compression(path: str, codec: Optional[str], level: Optional[int] = None) -> Tuple[Optional[str], str]:
+    """(codec to use or None, object name suffix) for uploading ``path``."""
+    codec = resolve_codec(codec)
+    if codec is None or not worth_compressing(path, codec, level):
+        return None, ""
+    return codec, EXTENSIONS[codec]
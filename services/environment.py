@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, Optional
+
+from sacred import Experiment
+from sacred.host_info import get_host_info
+from sacred.settings import SETTINGS
+
+# Settings turned off while a snapshot stands in for the per-run probes:
+# CPU/GPU probing is the slow part of host info, source and dependency
+# discovery the slow part of building an Experiment.
+_PROBE_SETTINGS = (
+    (("HOST_INFO", "INCLUDE_CPU_INFO"), False),
+    (("HOST_INFO", "INCLUDE_GPU_INFO"), False),
+    (("DISCOVER_SOURCES",), "none"),
+    (("DISCOVER_DEPENDENCIES",), "none"),
+)
+
+
+def _get_setting(path):
+    node = SETTINGS
+    for key in path:
+        node = node[key]
+    return node
+
+
+def _set_setting(path, value):
+    node = SETTINGS
+    for key in path[:-1]:
+        node = node[key]
+    node[path[-1]] = value
+
+
+class EnvironmentSnapshot:
+    """Experiment and host information collected once for a whole batch.
+
+    Every run of a batch shares the same sources, dependencies, git state and
+    host, so they are gathered once (``from_experiment``) and reported by each
+    ``SnapshotExperiment`` instead of being probed again. ``empty()`` skips the
+    collection altogether for pure data imports.
+    """
+
+    def __init__(self, experiment_info: Dict[str, Any], host_info: Dict[str, Any]):
+        self._experiment_info = experiment_info
+        self.host_info = host_info
+        self._saved_settings: Optional[list] = None
+
+    @classmethod
+    def from_experiment(cls, ex: Experiment) -> "EnvironmentSnapshot":
+        """Collect the snapshot from a probe experiment.
+
+        The probe must be built in the module whose sources should be
+        recorded, as Sacred inspects its caller's globals.
+        """
+        return cls(ex.get_experiment_info(), get_host_info(ex.additional_host_info))
+
+    @classmethod
+    def empty(cls) -> "EnvironmentSnapshot":
+        info = {"base_dir": "", "sources": [], "dependencies": [], "repositories": [], "mainfile": None}
+        return cls(info, {})
+
+    def experiment_info(self, name: str) -> Dict[str, Any]:
+        info = copy.deepcopy(self._experiment_info)
+        info["name"] = name
+        return info
+
+    def activate(self) -> None:
+        """Disable the per-run probes the snapshot replaces."""
+        if self._saved_settings is not None:
+            return
+        self._saved_settings = [(path, _get_setting(path)) for path, _ in _PROBE_SETTINGS]
+        for path, value in _PROBE_SETTINGS:
+            _set_setting(path, value)
+
+    def deactivate(self) -> None:
+        if self._saved_settings is None:
+            return
+        for path, value in self._saved_settings:
+            _set_setting(path, value)
+        self._saved_settings = None
+
+
+class SnapshotExperiment(Experiment):
+    """Experiment whose runs report an ``EnvironmentSnapshot``.
+
+    Build it while the snapshot is active so source and dependency discovery
+    are skipped.
+    """
+
+    def __init__(self, name: str, snapshot: EnvironmentSnapshot):
+        self._snapshot = snapshot
+        super().__init__(name, save_git_info=False)
+
+    def get_experiment_info(self):
+        return self._snapshot.experiment_info(self.path)
+
+    def _create_run(self, *args, **kwargs):
+        run = super()._create_run(*args, **kwargs)
+        run.host_info = copy.deepcopy(self._snapshot.host_info)
+        return run
@@ -6,114 +6,684 @@ import numpy as np
 import os
 import pandas as pd
 import csv
-from typing import Any, Dict
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import services.format_content as fc
-from services.raw_data_saver import save_raw_data
-from services.mongo_conn import build_mongo_url_from_payload
+from services.checksums import ChecksumCache
+from services.raw_data_saver import DEFAULT_PER_FILE_CONCURRENCY, DEFAULT_UPLOAD_WORKERS, MinioSession, build_raw_data_manifest, save_raw_data
+from services.mongo_conn import BatchMongoClient, build_mongo_url_from_payload
+from services.metrics_writer import BulkMetricsWriter
+from services.metrics_pyramid import PyramidBuilder, pyramid_levels, write_pyramids
+from services.metrics_columnar import ColumnarMetricsWriter, GridFSBlobStore, MinioBlobStore
+from services.journal import DONE, LOGGED, RAW_DATA, STARTED, journal_from_options
+from services.fingerprint import SyncIndex, folder_fingerprint, sync_destination, folder_uid, fingerprints_from_runs
+from services.environment import EnvironmentSnapshot, SnapshotExperiment
+from services.artifacts import add_artifacts
+import datetime
 
 
-def send_experiment(payload: Dict[str, Any]) -> Dict[str, Any]:
-    # Validate presence of top-level domains
-    if not isinstance(payload, dict):
-        return {"ok": False, "message": "Invalid payload"}
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# Set in pool workers by _init_worker: the worker's batch resources, and the
+# queue forwarding progress events to the parent process.
+_WORKER_CONTEXT = None
+_PROGRESS_QUEUE = None
+
+
+class _BatchContext:
+    """Per-process resources shared by every folder of a batch.
+
+    Built once in the sending process (or once per pool worker) and closed
+    when the batch ends.
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        mongo_url, mongo_db = build_mongo_url_from_payload(payload.get("mongo", {}) or {})
+        self.mongo = BatchMongoClient(mongo_url, mongo_db)
+        options = (payload.get("experiment", {}) or {}).get("options", {}) or {}
+        fc.configure_parse_cache(bool(options.get("parse_cache", 1)), options.get("parse_cache_mb"))
+        self.journal = journal_from_options(options, (payload.get("experiment", {}) or {}).get("folders", []) or [])
+        # Sacred environment (sources, dependencies, git, host): collected once
+        # here ("batch"), skipped ("none"), or probed by every run ("per_run").
+        # The probe is built in this module so its sources are recorded as before.
+        environment = options.get("environment", "batch") or "batch"
+        self.environment: Optional[EnvironmentSnapshot] = None
+        if environment == "none":
+            self.environment = EnvironmentSnapshot.empty()
+        elif environment != "per_run":
+            self.environment = EnvironmentSnapshot.from_experiment(Experiment("environment", save_git_info=True))
+        if self.environment is not None:
+            self.environment.activate()
+        self._minio: Optional[MinioSession] = None
+        # loaded once and saved when the batch ends, not per manifest
+        self.checksums = ChecksumCache()
+
+    def minio(self) -> MinioSession:
+        """The batch's S3 client, built on first use and sized for the upload threads."""
+        if self._minio is None:
+            raw_options = (((self.payload.get("experiment", {}) or {}).get("selectors", {}) or {}).get("raw_data", {}) or {}).get("options", {}) or {}
+            connections = int(raw_options.get("upload_workers", DEFAULT_UPLOAD_WORKERS) or 1) * int(raw_options.get("per_file_concurrency", DEFAULT_PER_FILE_CONCURRENCY) or 1)
+            self._minio = MinioSession(self.payload.get("minio", {}) or {}, max_pool_connections=connections)
+        return self._minio
+
+    def experiment(self, name: str) -> Experiment:
+        if self.environment is None:
+            return Experiment(name, save_git_info=True)
+        return SnapshotExperiment(name, self.environment)
+
+    def observer(self) -> MongoObserver:
+        return MongoObserver(client=self.mongo.client, db_name=self.mongo.db_name)
+
+    def record(self, folder: str, stage: str, run_id: Any = None, **fields) -> None:
+        if self.journal is not None:
+            self.journal.record(folder, stage, run_id, **fields)
+
+    def mark_interrupted(self, run_id: Any) -> None:
+        """Flag a run left RUNNING by a dead batch so it is not mistaken for a live one."""
+        self.mongo.database["runs"].update_one({"_id": run_id, "status": "RUNNING"}, {"$set": {"status": "INTERRUPTED"}})
+
+    def complete_run(
+        self, run_id: Any, raw_data_config: Optional[Dict[str, Any]], stop: bool = True, fingerprint: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Store the raw-data config (and sync fingerprint) of a run and, with ``stop``, mark it completed."""
+        update: Dict[str, Any] = {"status": "COMPLETED", "stop_time": datetime.datetime.utcnow()} if stop else {}
+        if raw_data_config:
+            update["info.dataFiles.raw_data"] = raw_data_config
+        if fingerprint:
+            update["info.fingerprint"] = fingerprint
+        if update:
+            self.mongo.database["runs"].update_one({"_id": run_id}, {"$set": update})
+
+    def close(self):
+        try:
+            self.checksums.save()
+        except OSError as e:
+            print(f"Could not save checksum cache: {e}")
+        if self.environment is not None:
+            self.environment.deactivate()
+        if self._minio is not None:
+            self._minio.close()
+        self.mongo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _emit(progress: Optional[ProgressCallback], folder: str, stage: str, **fields) -> None:
+    """Report a progress event; a failing callback never breaks a send."""
+    if progress is None:
+        return
+    event = {"folder": folder, "stage": stage}
+    event.update(fields)
+    try:
+        progress(event)
+    except Exception:
+        pass
+
+
+def _mongo_observer(_run):
+    for observer in _run.observers:
+        if isinstance(observer, MongoObserver):
+            return observer
+    return None
+
 
+def _metrics_writer(_run, folder: str, write_mode: str, metrics_options: Dict[str, Any], ctx: _BatchContext):
+    """Writer for the "bulk" and "columnar" modes, or None for log_scalar."""
+    observer = _mongo_observer(_run)
+    if observer is None or write_mode not in ("bulk", "columnar"):
+        return None
+    if write_mode == "columnar":
+        if metrics_options.get("columnar_store") == "minio":
+            store = MinioBlobStore(ctx.payload.get("minio", {}) or {}, session=ctx.minio())
+        else:
+            store = GridFSBlobStore(observer.fs)
+        return ColumnarMetricsWriter(store, _run.info, f"metrics/{folder_uid(folder)}/{_run._id}")
+    return BulkMetricsWriter(observer.metrics, observer.run_entry["_id"], _run.info)
+
+
+def _finish_folder(
+    folder: str,
+    ctx: _BatchContext,
+    state: Dict[str, Any],
+    progress: Optional[ProgressCallback] = None,
+    rawda: Optional[Dict[str, Any]] = None,
+    resumed: bool = True,
+    fingerprint: Optional[Dict[str, str]] = None,
+) -> Tuple[bool, str]:
+    """Complete a run whose document was stored but whose raw data was not.
+
+    Used when resuming (the run keeps its _id, the raw-data save is redone
+    if needed, and the run document is updated in place) and by the upload
+    stage of a pipelined batch (``resumed=False``, with the already listed
+    ``rawda``; the run's own completion time is kept). ``fingerprint`` is
+    only stored once the raw data is saved; a failed save fails the folder
+    and leaves it at LOGGED in the journal.
+    """
+    payload = ctx.payload
+    selectors = (payload.get("experiment", {}) or {}).get("selectors", {}) or {}
+    base_raw_data = selectors.get("raw_data", {}) or {}
+    experiment_name = folder.replace("\\", "/").split("/")[-1]
+    run_id = state["run_id"]
+    if resumed:
+        _emit(progress, folder, "resumed", run_id=run_id)
+    try:
+        rd_config = state.get("raw_data")
+        if state.get("stage") == LOGGED:
+            if rawda is None:
+                rawda = fc.format_raw_data(folder, base_raw_data)
+            rd_config = {}
+            if len(rawda) > 0:
+                rd_result, rd_config = save_raw_data(rawda, base_raw_data.get("options", {}) or {}, payload.get("minio", {}) or {}, ctx.minio(), ctx.checksums)
+                print(f"raw_data save: {rd_result}")
+                _emit(progress, folder, "raw_data", ok=bool(rd_result.get("ok")), message=rd_result.get("message", ""))
+                if not rd_result.get("ok"):
+                    raise RuntimeError(f"raw data not saved: {rd_result.get('message', '')}")
+            ctx.record(folder, RAW_DATA, run_id, raw_data=rd_config)
+        ctx.complete_run(run_id, rd_config, stop=resumed, fingerprint=fingerprint)
+        ctx.record(folder, DONE, run_id)
+    except Exception as e:
+        print(f"ERROR finishing run {run_id} for {folder}: {e}")
+        message = f"{experiment_name} failed: {e}"
+        _emit(progress, folder, "failed", ok=False, message=message)
+        return False, message
+    message = f"{experiment_name}, run {run_id} {'completed' if resumed else 'sent'}"
+    _emit(progress, folder, "done", ok=True, message=message, run_id=run_id)
+    return True, message
+
+
+def _parse_folder(folder: str, selectors: Dict[str, Any]) -> Dict[str, Any]:
+    """Read everything a send of ``folder`` needs before its run starts."""
+    experiment_name = folder.replace("\\", "/").split("/")[-1]
+    base_metrics = selectors.get("metrics", {}) or {}
+    cfg = {'experiment': experiment_name}
+    cfg.update(fc.format_config(folder, selectors.get("config", {}) or {}))
+    if (base_metrics.get("options", {}) or {}).get("streaming", 0):
+        # streaming: the metrics file is read in row chunks inside the run
+        # instead of being parsed up front
+        fc.check_metrics_source(folder, base_metrics)
+        mets = {}
+    else:
+        mets = fc.format_metrics(folder, base_metrics)
+    return {
+        "cfg": cfg,
+        "mets": mets,
+        "arts": fc.format_raw_data(folder, selectors.get("artifacts", {}) or {}),
+        "res": fc.format_results(folder, selectors.get("results", {}) or {}),
+        "rawda": fc.format_raw_data(folder, selectors.get("raw_data", {}) or {}),
+    }
+
+
+def _send_folder(
+    folder: str,
+    ctx: _BatchContext,
+    progress: Optional[ProgressCallback] = None,
+    resume_state: Optional[Dict[str, Any]] = None,
+    fingerprint: Optional[Dict[str, str]] = None,
+    parsed: Any = None,
+    defer_raw_data: Optional[Callable[[Any, Dict[str, Any]], None]] = None,
+) -> Tuple[bool, str]:
+    """Send one experiment folder as a Sacred run; returns (ok, message).
+
+    Module-level so it can be pickled into worker processes. ``progress``
+    receives one event per stage (parsed, run_created, metrics, raw_data,
+    done/failed). ``resume_state`` is the folder's last journal entry when
+    resuming a batch; ``fingerprint`` ({"uid", "digest"}) is stored in the
+    run's info for sync mode, once its raw data is saved. A failed raw-data
+    save fails the folder even though its run was stored.
+
+    Pipelined batches pass the ``_parse_folder`` output (or the exception it
+    raised) as ``parsed``, and a ``defer_raw_data(run_id, rawda)`` callable:
+    the run is then stored without waiting for its raw data, which is
+    handed over to the upload stage instead.
+    """
+    if resume_state and resume_state.get("run_id") is not None:
+        if resume_state.get("stage") in (LOGGED, RAW_DATA):
+            return _finish_folder(folder, ctx, resume_state, progress, fingerprint=fingerprint)
+        if resume_state.get("stage") == STARTED:
+            try:
+                ctx.mark_interrupted(resume_state["run_id"])
+            except Exception as e:
+                print(f"ERROR flagging run {resume_state['run_id']} as interrupted: {e}")
+    payload = ctx.payload
     data_payload = payload.get("experiment", {}) or {}
-    mongo_payload = payload.get("mongo", {}) or {}
-    # experiment_name = (data_payload.get("name") or "").strip()
     selectors = data_payload.get("selectors", {}) or {}
-    config = selectors.get("config", {}) or {}
-    metrics = selectors.get("metrics", {}) or {}
-    results = selectors.get("results", {}) or {}
-    raw_data = selectors.get("raw_data", {}) or {}
-    artifacts = selectors.get("artifacts", {}) or {}
-    folders = data_payload.get("folders", [])
+    base_metrics = selectors.get("metrics", {}) or {}
+    base_raw_data = selectors.get("raw_data", {}) or {}
 
-    raw_data_save_options = raw_data.get("options", {}) or {}
+    raw_data_save_options = base_raw_data.get("options", {}) or {}
+    artifacts_options = (selectors.get("artifacts", {}) or {}).get("options", {}) or {}
+    metrics_options = base_metrics.get("options", {}) or {}
+    metrics_write_mode = metrics_options.get("write_mode", "log_scalar")
+    metrics_streaming = bool(metrics_options.get("streaming", 0))
+    levels = pyramid_levels(metrics_options)
 
-    # --- Build Mongo connection using shared helper ---
-    mongo_payload = payload.get("mongo", {}) or {}
-    mongo_url, mongo_db = build_mongo_url_from_payload(mongo_payload)
+    experiment_name = folder.replace("\\", "/").split("/")[-1]
+    if parsed is None:
+        _emit(progress, folder, "started")
+        try:
+            parsed = _parse_folder(folder, selectors)
+        except Exception as e:
+            parsed = e
+    if isinstance(parsed, Exception):
+        print(f"ERROR formatting {folder}: {parsed}")
+        message = f"{experiment_name or 'TEST_EXPERIMENT'} failed: {parsed}"
+        _emit(progress, folder, "failed", ok=False, message=message)
+        return False, message
+    cfg, mets, arts, res, rawda = parsed["cfg"], parsed["mets"], parsed["arts"], parsed["res"], parsed["rawda"]
+    _emit(progress, folder, "parsed")
+    ex = ctx.experiment(experiment_name)
+    try:
+        ex.observers.append(ctx.observer())
+    except Exception:
+        pass
+    raw_data_errors: List[str] = []
 
-    print(f"payload: {payload}\n")
-    # Attach Mongo observer
-
-    # Keep originals for per-folder formatting
-    base_config = config
-    base_results = results
-    base_raw_data = raw_data
-    base_artifacts = artifacts
-    base_metrics = metrics
-    results_messages = []
-
-    if folders and len(folders) > 0:
-        all_ok = True
-        for folder in folders:
-            experiment_name = folder.replace("\\", "/").split("/")[-1]
-            cfg = {'experiment': experiment_name}
-            cfg.update(fc.format_config(folder, base_config))
-            mets = fc.format_metrics(folder, base_metrics)
-            arts = fc.format_raw_data(folder, base_artifacts)
-            res = fc.format_results(folder, base_results)
-            rawda = fc.format_raw_data(folder, base_raw_data)
-            ex = Experiment(experiment_name, save_git_info=True)
+    @ex.main
+    def run(_run, _mets=mets, _arts=arts, _folder=folder, _res=res):
+        print(f"res: {_res}\n")
+        _emit(progress, _folder, "run_created", run_id=_run._id)
+        ctx.record(_folder, STARTED, _run._id)
+        data_files = {}
+        _run.info['dataFiles'] = data_files
+        _run.info['result'] = _res
+        pyramids: Dict[str, PyramidBuilder] = {}
+        if metrics_streaming:
+            # streamed files always bypass log_scalar when Mongo is observed
+            writer = _metrics_writer(_run, _folder, "columnar" if metrics_write_mode == "columnar" else "bulk",
+                                     metrics_options, ctx)
+            columns = set()
+            for steps, column, values in fc.iter_metrics_chunks(_folder, base_metrics, metrics_options.get("chunk_rows")):
+                columns.add(column)
+                if levels:
+                    pyramids.setdefault(column, PyramidBuilder(levels)).add(steps, values)
+                if writer is not None:
+                    writer.add(column, values, steps=steps)
+                else:
+                    for step, value in zip(steps, values):
+                        _run.log_scalar(column, value, step=step)
+            if isinstance(writer, ColumnarMetricsWriter):
+                writer.flush()
+            if writer is not None:
+                print(f"metrics: {writer.points_written} points in {writer.documents_written} documents")
+            _emit(progress, _folder, "metrics", columns=len(columns))
+        elif isinstance(_mets, dict) and 'columns' in _mets:
+            writer = _metrics_writer(_run, _folder, metrics_write_mode, metrics_options, ctx)
+            if writer is not None:
+                x_axis = _mets.get('x_axis')
+                for column, values in _mets['columns'].items():
+                    writer.add(column, values, steps=x_axis[:len(values)] if x_axis is not None else None)
+                if isinstance(writer, ColumnarMetricsWriter):
+                    writer.flush()
+                print(f"metrics: {writer.points_written} points in {writer.documents_written} documents")
+            elif 'x_axis' in _mets:
+                x_axis = _mets['x_axis']
+                for column in _mets['columns']:
+                    for i, value in enumerate(_mets['columns'][column]):
+                        _run.log_scalar(column, value, step=x_axis[i])
+            else:
+                for column in _mets['columns']:
+                    for i, value in enumerate(_mets['columns'][column]):
+                        _run.log_scalar(column, value)
+            if levels:
+                x_axis = _mets.get('x_axis')
+                for column, values in _mets['columns'].items():
+                    steps = x_axis[:len(values)] if x_axis is not None else range(len(values))
+                    pyramids.setdefault(column, PyramidBuilder(levels)).add(steps, values)
+            _emit(progress, _folder, "metrics", columns=len(_mets['columns']))
+        if pyramids:
+            observer = _mongo_observer(_run)
+            if observer is not None:
+                try:
+                    writer = BulkMetricsWriter(observer.metrics, observer.run_entry["_id"], _run.info)
+                    written = write_pyramids(writer, pyramids, _run.info)
+                    print(f"metrics: {written} downsampled levels")
+                except Exception as e:
+                    print(f"ERROR writing downsampled metrics: {e}")
+        try:
+            art_manifest = build_raw_data_manifest({k: a for k, a in _arts.items() if isinstance(a, dict) and a.get('source_path') and os.path.exists(a['source_path'])},
+                                                   cache=ctx.checksums)
+            if _arts:
+                data_files.update(add_artifacts(_run, _arts, artifacts_options, payload.get("minio", {}) or {}, ctx.minio(), art_manifest, _mongo_observer(_run)))
+            if art_manifest:
+                # a list: file names contain dots, which Mongo field names cannot
+                data_files['artifacts_checksums'] = [
+                    {"name": os.path.basename(src), "size": entry["size"], "sha256": entry["sha256"]}
+                    for src, entry in art_manifest.items()
+                ]
+        except Exception as e:
+            print(f"ERROR adding artifacts: {e}")
+
+        if ctx.journal is not None:
+            # persist metrics and info now so a resume only has raw data left
+            _run._emit_heartbeat()
+            ctx.record(_folder, LOGGED, _run._id)
+
+        try:
+            if len(rawda) > 0 and defer_raw_data is None:
+                rd_result, rd_config = save_raw_data(rawda, raw_data_save_options, payload.get("minio", {}) or {}, ctx.minio(), ctx.checksums)
+                cfg['raw_data'] = rd_config
+                print(f"raw_data save: {rd_result}")
+                _emit(progress, _folder, "raw_data", ok=bool(rd_result.get("ok")), message=rd_result.get("message", ""))
+                data_files['raw_data'] = rd_config
+                if rd_result.get("ok"):
+                    ctx.record(_folder, RAW_DATA, _run._id, raw_data=rd_config)
+                else:
+                    raw_data_errors.append(rd_result.get("message", "") or "raw data not saved")
+
+        except Exception as e:
+            print(f"ERROR saving raw_data: {e}")
+            raw_data_errors.append(str(e))
+
+        # a deferred upload stores the fingerprint once the raw data is saved
+        if fingerprint and not raw_data_errors and (defer_raw_data is None or len(rawda) == 0):
+            _run.info['fingerprint'] = fingerprint
+        _run.info['dataFiles'] = data_files
+        _run.info['result'] = _res
+
+
+    ex.add_config(cfg)
+
+    try:
+        current_run = ex.run(options={'--capture': 'no'})
+        current_run.result = res
+        if defer_raw_data is not None and len(rawda) > 0:
+            # LOGGED was journaled inside the run; the upload stage saves
+            # the raw data, then records DONE
+            defer_raw_data(current_run._id, rawda)
+            return True, f"{experiment_name or 'TEST_EXPERIMENT'}, run {current_run._id} stored, raw data queued"
+        if raw_data_errors:
+            # left at LOGGED in the journal, so a resume retries the raw data
+            message = f"{experiment_name or 'TEST_EXPERIMENT'}, run {current_run._id} stored but raw data failed: {raw_data_errors[0]}"
+            _emit(progress, folder, "failed", ok=False, message=message, run_id=current_run._id)
+            return False, message
+        ctx.record(folder, DONE, current_run._id)
+        message = f"{experiment_name or 'TEST_EXPERIMENT'}, run {current_run._id} sent"
+        _emit(progress, folder, "done", ok=True, message=message, run_id=current_run._id)
+        return True, message
+    except Exception as e:
+        import traceback
+        print("ERROR running experiment:", e)
+        print(traceback.format_exc())
+        message = f"{experiment_name or 'TEST_EXPERIMENT'} failed: {e}"
+        _emit(progress, folder, "failed", ok=False, message=message)
+        return False, message
+
+
+def _send_folders_pipelined(
+    folders: List[str],
+    ctx: _BatchContext,
+    progress: Optional[ProgressCallback] = None,
+    states: Optional[Dict[str, Dict[str, Any]]] = None,
+    fingerprints: Optional[Dict[str, Dict[str, str]]] = None,
+    depth: int = 2,
+) -> List[Tuple[bool, str]]:
+    """Send folders with parsing, run logging and raw-data uploads overlapped.
+
+    A parser thread reads folder N+1 while this thread logs folder N's run
+    and an upload thread saves folder N-1's raw data and finalizes its run
+    document. The queues between stages hold at most ``depth`` folders, so a
+    slow stage holds the others back instead of letting parsed data pile up.
+    Runs are still created one at a time on this thread, as Sacred requires.
+    """
+    states = states or {}
+    fingerprints = fingerprints or {}
+    selectors = (ctx.payload.get("experiment", {}) or {}).get("selectors", {}) or {}
+    results: List[Optional[Tuple[bool, str]]] = [None] * len(folders)
+    deferred = set()
+    parsed_queue: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+    upload_queue: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+    done = object()
+    stop = threading.Event()
+
+    def parse_stage():
+        for index, folder in enumerate(folders):
+            if stop.is_set():
+                return
+            state = states.get(folder) or {}
+            parsed = None
+            # folders resumed past their run only need the upload stage
+            if not (state.get("run_id") is not None and state.get("stage") in (LOGGED, RAW_DATA)):
+                _emit(progress, folder, "started")
+                try:
+                    parsed = _parse_folder(folder, selectors)
+                except Exception as e:
+                    parsed = e
+            parsed_queue.put((index, folder, parsed))
+        parsed_queue.put(done)
+
+    def drain_parsed():
+        # unblock a parser waiting on the full queue so it sees ``stop``
+        while parser.is_alive():
+            try:
+                parsed_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def upload_stage():
+        while True:
+            item = upload_queue.get()
+            if item is done:
+                return
+            index, folder, run_id, rawda = item
+            results[index] = _finish_folder(folder, ctx, {"run_id": run_id, "stage": LOGGED}, progress, rawda=rawda, resumed=False,
+                                            fingerprint=fingerprints.get(folder))
+
+    parser = threading.Thread(target=parse_stage, name="send-parse", daemon=True)
+    uploader = threading.Thread(target=upload_stage, name="send-upload", daemon=True)
+    parser.start()
+    uploader.start()
+    try:
+        while True:
+            item = parsed_queue.get()
+            if item is done:
+                break
+            index, folder, parsed = item
+
+            def defer(run_id, rawda, index=index, folder=folder):
+                deferred.add(index)
+                upload_queue.put((index, folder, run_id, rawda))
+
+            outcome = _send_folder(folder, ctx, progress, states.get(folder), fingerprints.get(folder), parsed=parsed, defer_raw_data=defer)
+            # deferred folders get their outcome from the upload stage
+            if index not in deferred:
+                results[index] = outcome
+    finally:
+        # also reached when logging a run raised: stop the parser, empty its
+        # queue so it is not stuck on put(), and let the uploads finish
+        stop.set()
+        drain_parsed()
+        parser.join()
+        upload_queue.put(done)
+        uploader.join()
+    # a deferred folder is only settled once its upload finished
+    return [result if result is not None else (False, f"{folder} not sent") for folder, result in zip(folders, results)]
+
+
+def _init_worker(payload: Dict[str, Any], progress_queue) -> None:
+    global _WORKER_CONTEXT, _PROGRESS_QUEUE
+    _WORKER_CONTEXT = _BatchContext(payload)
+    # pool workers exit through sys.exit, which runs atexit handlers
+    atexit.register(_WORKER_CONTEXT.close)
+    _PROGRESS_QUEUE = progress_queue
+
+
+def _send_folder_in_worker(folder: str, resume_state: Optional[Dict[str, Any]] = None, fingerprint: Optional[Dict[str, str]] = None) -> Tuple[bool, str]:
+    progress = _PROGRESS_QUEUE.put if _PROGRESS_QUEUE is not None else None
+    return _send_folder(folder, _WORKER_CONTEXT, progress, resume_state, fingerprint)
+
+
+def _send_folders_in_pool(
+    folders: List[str],
+    payload: Dict[str, Any],
+    workers: int,
+    progress: Optional[ProgressCallback] = None,
+    states: Optional[Dict[str, Dict[str, Any]]] = None,
+    fingerprints: Optional[Dict[str, Dict[str, str]]] = None,
+) -> List[Tuple[bool, str]]:
+    """Send folders with a pool of worker processes, keeping input order.
+
+    Processes rather than threads: Sacred experiments and their observers
+    are not safe to share between threads. The "spawn" start method keeps
+    children free of the GUI's Tk state and threads. Each worker builds its
+    own _BatchContext once and reuses it for all the folders it sends.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    outcomes: List[Tuple[bool, str]] = []
+    progress_queue = ctx.Queue() if progress is not None else None
+
+    def _drain():
+        # relay worker events to the caller's callback until the sentinel
+        for event in iter(progress_queue.get, None):
             try:
-                ex.observers.append(MongoObserver(url=mongo_url, db_name=mongo_db))
+                progress(event)
             except Exception:
                 pass
 
-            @ex.main
-            def run(_run, _mets=mets, _arts=arts, _folder=folder, _res=res):
-                print(f"res: {_res}\n")
-                data_files = {}
-                if isinstance(_mets, dict) and 'columns' in _mets:
-                    if 'x_axis' in _mets:
-                        x_axis = _mets['x_axis']
-                        for column in _mets['columns']:
-                            for i, value in enumerate(_mets['columns'][column]):
-                                _run.log_scalar(column, value, step=x_axis[i])
-                    else:
-                        for column in _mets['columns']:
-                            for i, value in enumerate(_mets['columns'][column]):
-                                _run.log_scalar(column, value)
+    relay = None
+    if progress_queue is not None:
+        relay = threading.Thread(target=_drain, daemon=True)
+        relay.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(folders)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(payload, progress_queue),
+        ) as pool:
+            futures = [
+                pool.submit(_send_folder_in_worker, folder, (states or {}).get(folder), (fingerprints or {}).get(folder))
+                for folder in folders
+            ]
+            for folder, future in zip(folders, futures):
                 try:
-                    config_arts = {}
-                    for a in _arts.values():
-                        src = a.get('source_path') if isinstance(a, dict) else str(a)
-                        name = a.get('new_name') if isinstance(a, dict) else None
-                        if not src:
-                            continue
-                        if os.path.exists(src):
-                            _run.add_artifact(src, name=name)
-                            config_arts[a.get('minio_folder')] = name
-                        data_files['artifacts'] = config_arts
-                except Exception:
-                    pass
+                    outcomes.append(future.result())
+                except Exception as e:
+                    # worker crashed or the result could not be transferred back
+                    experiment_name = folder.replace("\\", "/").split("/")[-1]
+                    print(f"ERROR in worker for {folder}: {e}")
+                    message = f"{experiment_name} failed: {e}"
+                    _emit(progress, folder, "failed", ok=False, message=message)
+                    outcomes.append((False, message))
+    finally:
+        if relay is not None:
+            progress_queue.put(None)
+            relay.join()
+    return outcomes
 
-                try:
-                    if len(rawda) > 0:
-                        rd_result, rd_config = save_raw_data(rawda, raw_data_save_options, payload.get("minio", {}) or {})
-                        cfg['raw_data'] = rd_config
-                        print(f"raw_data save: {rd_result}")
-                        data_files['raw_data'] = rd_config
 
-                except Exception as e:
-                    print(f"ERROR saving raw_data: {e}")
+def send_experiment(payload: Dict[str, Any], progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Send every folder of the payload as a Sacred run.
 
-                _run.info['dataFiles'] = data_files
-                _run.info['result'] = _res
-            
+    ``progress`` is an optional callable receiving one dict per folder and
+    stage (``{"folder", "stage", ...}``); in pool mode events are relayed
+    from the worker processes. Returns ``{"ok", "message"}``.
+    """
+    # Validate presence of top-level domains
+    if not isinstance(payload, dict):
+        return {"ok": False, "message": "Invalid payload"}
 
-            ex.add_config(cfg)
+    data_payload = payload.get("experiment", {}) or {}
+    folders = data_payload.get("folders", []) or []
+    send_options = data_payload.get("options", {}) or {}
 
+    # Fail fast on an unusable Mongo configuration before touching any folder
+    build_mongo_url_from_payload(payload.get("mongo", {}) or {})
+
+    print(f"payload: {payload}\n")
+
+    if not folders:
+        return {"ok": False, "message": "No experiment folder selected"}
+
+    # Checkpoint journal: reset for a fresh batch, read back when resuming.
+    # Workers get the resolved path (or False) so they all append to the
+    # same file, or none.
+    states: Dict[str, Dict[str, Any]] = {}
+    journal = journal_from_options(send_options, folders)
+    if journal is not None:
+        if send_options.get("resume"):
+            states = journal.load()
+        else:
+            journal.reset()
+    payload = dict(payload)
+    payload["experiment"] = dict(data_payload, options=dict(send_options, journal=str(journal.path) if journal is not None else False))
+
+    # Sync mode: fingerprint every folder from a stat pass and skip the ones
+    # whose last send (local index, else the runs' info) has the same digest.
+    fingerprints: Dict[str, Dict[str, str]] = {}
+    sync_index = None
+    previous: Dict[str, str] = {}
+    if send_options.get("sync"):
+        mongo_url, mongo_db = build_mongo_url_from_payload(payload.get("mongo", {}) or {})
+        sync_index = SyncIndex(sync_destination(mongo_url, mongo_db), legacy=f"{mongo_url}/{mongo_db}")
+        selectors = data_payload.get("selectors", {}) or {}
+        for folder in folders:
+            digest = folder_fingerprint(folder, selectors)
+            if digest:
+                fingerprints[folder] = {"uid": folder_uid(folder), "digest": digest}
+        for fp in fingerprints.values():
+            if sync_index.get(fp["uid"]):
+                previous[fp["uid"]] = sync_index.get(fp["uid"])
+        missing = [fp["uid"] for fp in fingerprints.values() if fp["uid"] not in previous]
+        if missing:
             try:
-                current_run = ex.run(options={'--capture': 'no'})
-                current_run.result = res
-                # After run, optionally save raw_data (if any) according to options
-                results_messages.append(f"{experiment_name or 'TEST_EXPERIMENT'}, run {current_run._id} sent")
+                with BatchMongoClient(mongo_url, mongo_db) as lookup:
+                    previous.update(fingerprints_from_runs(lookup.database["runs"], missing))
             except Exception as e:
-                import traceback
-                print("ERROR running experiment:", e)
-                print(traceback.format_exc())
-                all_ok = False
-                results_messages.append(f"{experiment_name or 'TEST_EXPERIMENT'} failed: {e}")
-        return {"ok": all_ok, "message": "; ".join(results_messages)}
\ No newline at end of file
+                print(f"ERROR looking up previous fingerprints: {e}")
+
+    outcome_by_folder: Dict[str, Tuple[bool, str]] = {}
+    pending: List[str] = []
+    for folder in folders:
+        state = states.get(folder)
+        fp = fingerprints.get(folder)
+        if fp and previous.get(fp["uid"]) == fp["digest"]:
+            experiment_name = folder.replace("\\", "/").split("/")[-1]
+            message = f"{experiment_name} unchanged"
+            _emit(progress, folder, "skipped", ok=True, message=message)
+            outcome_by_folder[folder] = (True, message)
+        elif state and state.get("stage") == DONE:
+            experiment_name = folder.replace("\\", "/").split("/")[-1]
+            message = f"{experiment_name}, run {state.get('run_id')} already sent"
+            _emit(progress, folder, "skipped", ok=True, message=message, run_id=state.get("run_id"))
+            outcome_by_folder[folder] = (True, message)
+        else:
+            pending.append(folder)
+
+    workers = max(1, int(send_options.get("workers", 1) or 1))
+    _emit(progress, "", "batch_started", folders=len(folders), pending=len(pending), workers=workers)
+    if workers > 1 and len(pending) > 1:
+        sent = _send_folders_in_pool(pending, payload, workers, progress, states, fingerprints)
+    elif pending:
+        with _BatchContext(payload) as ctx:
+            if send_options.get("pipeline", 1) and len(pending) > 1:
+                sent = _send_folders_pipelined(pending, ctx, progress, states, fingerprints)
+            else:
+                sent = [_send_folder(folder, ctx, progress, states.get(folder), fingerprints.get(folder)) for folder in pending]
+    else:
+        sent = []
+    outcome_by_folder.update(zip(pending, sent))
+    outcomes = [outcome_by_folder[folder] for folder in folders]
+
+    if sync_index is not None:
+        for folder, fp in fingerprints.items():
+            if outcome_by_folder[folder][0]:
+                sync_index.update(fp["uid"], fp["digest"], folder)
+        try:
+            sync_index.save()
+        except OSError as e:
+            print(f"ERROR saving sync index: {e}")
+
+    all_ok = all(ok for ok, _ in outcomes)
+    succeeded = sum(1 for ok, _ in outcomes if ok)
+    _emit(progress, "", "batch_done", ok=all_ok, sent=succeeded, failed=len(outcomes) - succeeded)
+    return {"ok": all_ok, "message": "; ".join(message for _, message in outcomes)}
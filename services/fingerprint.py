@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import unquote, urlsplit
+
+from services.hash import make_compact_uid_b32, short_hash_b32
+from services.prefs import STATE_DIR
+
+
+def folder_uid(folder: str) -> str:
+    """Stable key of an experiment folder (same UID as the raw-data names)."""
+    name = folder.replace("\\", "/").rstrip("/").split("/")[-1]
+    try:
+        return make_compact_uid_b32(name)
+    except ValueError:
+        # folder names without a timecode still get a stable key
+        return short_hash_b32(name)
+
+
+def _stat_entry(path: str):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def folder_fingerprint(folder: str, selectors: Dict[str, Any]) -> Optional[str]:
+    """Digest of everything a send of ``folder`` depends on, from stats only.
+
+    Covers the selector settings, the size and mtime of the selected
+    config/metrics/results files and of every selected raw-data/artifact
+    file. Returns None when a selected file is missing, so the folder is
+    always sent (and fails with the usual message).
+    """
+    entries: Dict[str, Any] = {"selectors": selectors}
+    try:
+        for key in ("config", "metrics", "results"):
+            name = (selectors.get(key, {}) or {}).get("name") or "None"
+            if name != "None":
+                entries[key] = _stat_entry(os.path.join(folder, name))
+        for key in ("raw_data", "artifacts"):
+            selector = selectors.get(key, {}) or {}
+            name = selector.get("name") or "None"
+            if name == "None":
+                continue
+            path = os.path.join(folder, name)
+            if os.path.isdir(path):
+                files = selector.get("files", [])
+                if files is None:  # no explicit choice: the whole folder is sent
+                    files = [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
+                entries[key] = {f: _stat_entry(os.path.join(path, f)) for f in sorted(files)}
+            else:
+                entries[key] = _stat_entry(path)
+    except OSError:
+        return None
+    blob = json.dumps(entries, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def sync_destination(mongo_url: str, db_name: str) -> str:
+    """``user@hosts/db`` of a Mongo URL: the password and options are left out,
+    so changing them keeps the sync state."""
+    parts = urlsplit(mongo_url)
+    userinfo, _, hosts = parts.netloc.rpartition("@")
+    user = unquote(userinfo.partition(":")[0])
+    return f"{parts.scheme}://{user}@{hosts.lower()}/{db_name}"
+
+
+class SyncIndex:
+    """Local index of the last fingerprint sent per folder UID.
+
+    One JSON file per destination database (see ``sync_destination``),
+    rewritten atomically. ``legacy`` is the key indexes used to be stored
+    under (the full URL), read when no index exists under ``destination``.
+    """
+
+    def __init__(self, destination: str, legacy: Optional[str] = None):
+        self.path = STATE_DIR / "sync" / f"{short_hash_b32(destination)}.json"
+        sources = [self.path] + ([STATE_DIR / "sync" / f"{short_hash_b32(legacy)}.json"] if legacy else [])
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        for source in sources:
+            try:
+                self.entries = json.loads(source.read_text(encoding="utf-8"))
+                break
+            except (OSError, ValueError):
+                continue
+
+    def get(self, uid: str) -> Optional[str]:
+        return (self.entries.get(uid) or {}).get("fingerprint")
+
+    def update(self, uid: str, fingerprint: str, folder: str) -> None:
+        self.entries[uid] = {"fingerprint": fingerprint, "folder": folder}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def fingerprints_from_runs(runs_collection, uids: Iterable[str]) -> Dict[str, str]:
+    """Latest fingerprint per UID recorded in completed runs' ``info``."""
+    uids = list(uids)
+    if not uids:
+        return {}
+    found: Dict[str, str] = {}
+    cursor = runs_collection.find(
+        {"info.fingerprint.uid": {"$in": uids}, "status": "COMPLETED"},
+        {"info.fingerprint": 1},
+    ).sort("_id", 1)
+    for run in cursor:
+        fp = (run.get("info") or {}).get("fingerprint") or {}
+        if fp.get("uid") and fp.get("digest"):
+            found[fp["uid"]] = fp["digest"]
+    return found
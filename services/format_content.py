@@ -3,8 +3,31 @@ import numpy as np
 import json
 import os
 from services.hash import make_compact_uid_b32
+from services.parse_cache import DEFAULT_MAX_MB, ParseCache
 import re
 
+# Cache of parsed Excel/CSV tables shared by the format_* readers; None
+# disables it. Set per process by configure_parse_cache.
+_PARSE_CACHE = None
+
+
+def configure_parse_cache(enabled=True, max_mb=DEFAULT_MAX_MB, directory=None):
+    """Turn the on-disk parse cache on or off for this process."""
+    global _PARSE_CACHE
+    _PARSE_CACHE = ParseCache(directory, int(float(max_mb or DEFAULT_MAX_MB) * 1024 * 1024)) if enabled else None
+
+
+def _read_excel(file_path, **options):
+    if _PARSE_CACHE is None:
+        return pd.read_excel(file_path, **options)
+    return _PARSE_CACHE.read(file_path, "read_excel", pd.read_excel, **options)
+
+
+def _read_csv(file_path, **options):
+    if _PARSE_CACHE is None:
+        return pd.read_csv(file_path, **options)
+    return _PARSE_CACHE.read(file_path, "read_csv", pd.read_csv, **options)
+
 
 def coerce_bool_option(value):
     if value == 0:
@@ -23,11 +46,11 @@ def format_config(experiment_folder, config):
             if config["options"]["flatten"]:
                 data = pd.json_normalize(data, sep="_").to_dict(orient="records")[0]
         elif config_type == "xlsx" or config_type == "xlsm":
-            data = pd.read_excel(file_path, sheet_name=config["sheet"]).to_dict(orient="records")
+            data = _read_excel(file_path, sheet_name=config["sheet"]).to_dict(orient="records")
         elif config_type == "csv":
             sep = (config.get("options", {}) or {}).get("sep", ",")
             sep = "\t" if sep == "\\t" else sep
-            data = pd.read_csv(file_path, sep=sep).to_dict(orient="records")
+            data = _read_csv(file_path, sep=sep).to_dict(orient="records")
         else:
             raise ValueError(f"Unsupported config type: {config_type}")
     return data
@@ -39,15 +62,19 @@ def format_metrics(experiment_folder, metrics):
         file_path = os.path.join(experiment_folder, metrics["name"])
         metrics_type = metrics["name"].split(".")[-1]
         if metrics_type == "xlsx" or metrics_type == "xlsm":
-            df = pd.read_excel(file_path, sheet_name=metrics["sheet"], header=coerce_bool_option(metrics["options"]["header"]))
+            df = _read_excel(file_path, sheet_name=metrics["sheet"], header=coerce_bool_option(metrics["options"]["header"]))
         elif metrics_type == "csv":
-            df = pd.read_csv(file_path, header=coerce_bool_option(metrics["options"]["header"]))
+            df = _read_csv(file_path, header=coerce_bool_option(metrics["options"]["header"]))
         else:
             raise ValueError(f"Unsupported metrics type: {metrics_type}")
 
         metrics_columns = {}
+        # None: no explicit choice, every column is sent
+        selected = metrics["options"]["selected_cols"]
+        if selected is None:
+            selected = list(df.columns)
 
-        for col in metrics["options"]["selected_cols"]:
+        for col in selected:
             if metrics["options"]["has_time"]==1:
                 if col == metrics["options"]["time_col"]:
                     metrics_data["x_axis"] = df[col].to_list()
@@ -61,19 +88,110 @@ def format_metrics(experiment_folder, metrics):
     return metrics_data
 
 
+DEFAULT_METRICS_CHUNK_ROWS = 100_000
+
+
+def _metrics_source(experiment_folder, metrics):
+    file_path = os.path.join(experiment_folder, metrics["name"])
+    metrics_type = metrics["name"].split(".")[-1]
+    if metrics_type not in ("xlsx", "xlsm", "csv"):
+        raise ValueError(f"Unsupported metrics type: {metrics_type}")
+    if not os.path.isfile(file_path):
+        raise ValueError(f"Metrics file not found: {file_path}")
+    return file_path, metrics_type
+
+
+def check_metrics_source(experiment_folder, metrics):
+    """Validate the metrics selector without reading the file."""
+    if metrics["name"] != "None":
+        _metrics_source(experiment_folder, metrics)
+
+
+def _iter_excel_frames(file_path, sheet, header, chunk_rows):
+    # openpyxl's read-only mode streams rows, unlike pd.read_excel
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filename=file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet and sheet in wb.sheetnames else wb[wb.sheetnames[0]]
+        rows_iter = ws.iter_rows(values_only=True)
+        names = None
+        if header is not None:
+            first = next(rows_iter, None)
+            if first is None:
+                return
+            names = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(first)]
+        rows = []
+        for row in rows_iter:
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                yield pd.DataFrame(rows, columns=names if names is not None else range(len(rows[0])))
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=names if names is not None else range(len(rows[0])))
+    finally:
+        wb.close()
+
+
+def iter_metrics_chunks(experiment_folder, metrics, chunk_rows=DEFAULT_METRICS_CHUNK_ROWS):
+    """Stream the selected metrics as (steps, column, values) batches.
+
+    Same selection rules as ``format_metrics``, but the file is read
+    ``chunk_rows`` rows at a time so memory stays bounded whatever its
+    length. Without an x-axis column, steps are the row numbers.
+    """
+    if metrics["name"] == "None":
+        return
+    options = metrics["options"]
+    file_path, metrics_type = _metrics_source(experiment_folder, metrics)
+    header = coerce_bool_option(options["header"])
+    # None: no explicit choice, every column is sent (known from the first chunk)
+    selected = list(options["selected_cols"]) if options["selected_cols"] is not None else None
+    time_col = None
+    if options["has_time"] == 1 and (selected is None or options["time_col"] in selected):
+        time_col = options["time_col"] or None
+    columns = [c for c in selected if c != time_col] if selected is not None else None
+    chunk_rows = max(1, int(chunk_rows or DEFAULT_METRICS_CHUNK_ROWS))
+
+    if metrics_type == "csv":
+        sep = options.get("sep", ",") or ","
+        sep = "\t" if sep == "\\t" else sep
+        frames = pd.read_csv(
+            file_path,
+            sep=sep,
+            header=header,
+            usecols=selected if header is not None and selected is not None else None,
+            chunksize=chunk_rows,
+        )
+    else:
+        frames = _iter_excel_frames(file_path, metrics.get("sheet"), header, chunk_rows)
+
+    offset = 0
+    for frame in frames:
+        if columns is None:
+            if time_col is not None and time_col not in frame.columns:
+                time_col = None
+            columns = [c for c in frame.columns if c != time_col]
+        n = len(frame)
+        steps = frame[time_col].to_list() if time_col is not None else list(range(offset, offset + n))
+        for col in columns:
+            yield steps, col, frame[col].to_list()
+        offset += n
+
+
 def format_results(experiment_folder, results):
     results_data = {}
     if results["name"] != "None":
         file_path = os.path.join(experiment_folder, results["name"])
         results_type = results["name"].split(".")[-1]
         if results_type == "xlsx" or results_type == "xlsm":
-            data_ = pd.read_excel(file_path, sheet_name=results["sheet"], header=None).to_dict(orient="records")
+            data_ = _read_excel(file_path, sheet_name=results["sheet"], header=None).to_dict(orient="records")
             data = {e[0]: e[1] for e in data_}
 
         elif results_type == "csv":
             sep = (results.get("options", {}) or {}).get("sep", ",")
             sep = "\t" if sep == "\\t" else sep
-            data_ = pd.read_csv(file_path, sep=sep, header=None).to_dict(orient="records")
+            data_ = _read_csv(file_path, sep=sep, header=None).to_dict(orient="records")
             data = {e[0]: e[1] for e in data_}
 
         elif results_type == "json":
@@ -104,7 +222,11 @@ def format_raw_data(experiment_folder, raw_data):
             files[raw_data["name"]] = file
 
         elif os.path.isdir(file_path):
-            for f in raw_data["files"]:
+            # None: no explicit choice, every file of the folder is sent
+            names = raw_data["files"]
+            if names is None:
+                names = sorted(n for n in os.listdir(file_path) if os.path.isfile(os.path.join(file_path, n)))
+            for f in names:
                 file = {
                     'source_path': os.path.join(file_path, f),
                     'new_name': make_compact_uid_b32(experiment_name) + "-" + f,
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from services.hash import short_hash_b32
+from services.prefs import STATE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Stages recorded for a folder, in order. "logged" means the run document,
+# its metrics and artifacts are stored; only the raw-data save is left.
+STARTED = "started"
+LOGGED = "logged"
+RAW_DATA = "raw_data"
+DONE = "done"
+
+
+def _lock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        # a one-byte region at offset 0 works as a whole-file lock; LK_LOCK
+        # retries for about 10 seconds before raising OSError
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def default_journal_path(folders: Iterable[str]) -> Path:
+    """Journal location for a batch, keyed by the parent folder(s)."""
+    parents = sorted({str(Path(f).parent) for f in folders})
+    key = short_hash_b32("\n".join(parents))
+    return STATE_DIR / "journals" / f"{key}.jsonl"
+
+
+class SendJournal:
+    """Append-only JSON-lines journal of per-folder send progress.
+
+    Every record is one line appended under an exclusive file lock (flock,
+    or msvcrt.locking on Windows, where ``O_APPEND`` writes from several
+    processes can overwrite each other) and fsync'ed, so pool workers and
+    pipeline threads can share the file. A crash leaves at most one torn
+    last line, which ``load`` ignores.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def record(self, folder: str, stage: str, run_id: Any = None, **fields) -> None:
+        entry: Dict[str, Any] = {"folder": folder, "stage": stage}
+        if run_id is not None:
+            entry["run_id"] = run_id
+        entry.update(fields)
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            _lock(fd)
+            try:
+                os.lseek(fd, 0, os.SEEK_END)
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Return the latest state per folder (fields merged across records)."""
+        states: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    folder = entry.get("folder")
+                    if not folder:
+                        continue
+                    if entry.get("stage") == STARTED:
+                        # a new attempt supersedes whatever an older one left
+                        states[folder] = entry
+                    else:
+                        states.setdefault(folder, {}).update(entry)
+        except FileNotFoundError:
+            pass
+        return states
+
+    def reset(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def journal_from_options(options: Dict[str, Any], folders: Iterable[str]) -> Optional[SendJournal]:
+    """The batch's journal, or None when it is off.
+
+    ``options["journal"]`` False turns it off and a path forces it on.
+    Otherwise it is only kept for batches of several folders (or when
+    resuming): each record costs an fsync, and each run an extra
+    heartbeat, which a single folder can simply send again.
+    """
+    folders = list(folders)
+    path = options.get("journal")
+    if path is False:
+        return None
+    if not path and len(folders) < 2 and not options.get("resume"):
+        return None
+    return SendJournal(Path(path).expanduser() if path else default_journal_path(folders))
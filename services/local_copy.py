@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+from typing import Callable, Dict, List
+
+# Local save strategies, cheapest first. "auto" tries them in this order.
+STRATEGIES = ("reflink", "hardlink", "copy_file_range", "copy")
+
+_FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Copy-on-write clone (Btrfs, XFS, APFS...): no data is copied."""
+    if sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return
+    import fcntl  # not on Windows: the ImportError counts as "unsupported"
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def _hardlink(src: str, dst: str) -> None:
+    """Second name for the same inode; the file shares its data and mtime."""
+    os.link(src, dst)
+
+
+def _copy_file_range(src: str, dst: str) -> None:
+    """Kernel-side copy, no round trip of the data through user space."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        copy = getattr(os, "copy_file_range", None)
+        while remaining > 0:
+            if copy is not None:
+                try:
+                    n = copy(fsrc.fileno(), fdst.fileno(), remaining)
+                except OSError:
+                    # e.g. EXDEV on older kernels: sendfile works across filesystems
+                    copy = None
+                    continue
+            else:
+                n = os.sendfile(fdst.fileno(), fsrc.fileno(), None, remaining)
+            if n == 0:
+                break
+            remaining -= n
+    shutil.copystat(src, dst)
+
+
+def _copy(src: str, dst: str) -> None:
+    shutil.copy2(src, dst)
+
+
+_IMPLEMENTATIONS: Dict[str, Callable[[str, str], None]] = {
+    "reflink": _reflink,
+    "hardlink": _hardlink,
+    "copy_file_range": _copy_file_range,
+    "copy": _copy,
+}
+
+
+def _candidates(strategy: str) -> List[str]:
+    if strategy in ("", "auto", None):
+        return list(STRATEGIES)
+    if strategy not in _IMPLEMENTATIONS:
+        raise ValueError(f"Unknown local save strategy: {strategy}")
+    # the requested strategy, with a plain copy as the last resort
+    return [strategy] if strategy == "copy" else [strategy, "copy"]
+
+
+def place_file(src: str, dst: str, strategy: str = "auto") -> str:
+    """Make ``dst`` a copy of ``src`` with the cheapest working strategy.
+
+    The file is built under a temporary name next to ``dst`` and renamed
+    over it, so an existing target is only replaced once the new one is
+    complete. Returns the strategy that succeeded.
+    """
+    tmp = f"{dst}.part-{os.getpid()}"
+    last_error = None
+    for name in _candidates(strategy):
+        try:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            _IMPLEMENTATIONS[name](src, tmp)
+            os.replace(tmp, dst)
+            return name
+        except (OSError, ImportError, AttributeError) as e:
+            last_error = e
+    try:
+        os.unlink(tmp)
+    except OSError:
+        pass
+    raise last_error
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from services.raw_data_saver import MinioSession, load_bytes_from_minio, save_bytes_to_minio
+
+try:  # optional, much faster than zlib at a similar ratio
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None
+
+FORMAT = "npy"
+
+
+def _compress(raw: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(raw), "zstd"
+    return zlib.compress(raw, 6), "zlib"
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed metrics")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    raise ValueError(f"Unknown metrics codec: {codec}")
+
+
+def _as_array(values: Iterable[Any]) -> np.ndarray:
+    """Numeric array when possible, fixed-width text otherwise (never object)."""
+    arr = np.asarray(list(values) if not isinstance(values, np.ndarray) else values)
+    if arr.dtype.kind in "biuf":
+        return arr
+    try:
+        return arr.astype(float)
+    except (TypeError, ValueError):
+        return arr.astype(str)
+
+
+def encode_array(arr: np.ndarray) -> Tuple[bytes, Dict[str, Any]]:
+    """Serialize ``arr`` as a compressed ``.npy`` blob; returns (blob, descriptor)."""
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    blob, codec = _compress(buf.getvalue())
+    return blob, {
+        "dtype": arr.dtype.str,
+        "length": int(arr.shape[0]),
+        "codec": codec,
+        "bytes": len(blob),
+        "sha256": hashlib.sha256(blob).hexdigest(),
+    }
+
+
+def decode_array(blob: bytes, descriptor: Dict[str, Any]) -> np.ndarray:
+    if descriptor.get("sha256") and hashlib.sha256(blob).hexdigest() != descriptor["sha256"]:
+        raise ValueError("Metric array checksum mismatch")
+    return np.load(io.BytesIO(_decompress(blob, descriptor["codec"])), allow_pickle=False)
+
+
+class GridFSBlobStore:
+    """Store blobs in the run database's GridFS (the observer's ``fs``)."""
+
+    kind = "gridfs"
+
+    def __init__(self, fs):
+        self.fs = fs
+
+    def put(self, key: str, blob: bytes) -> Dict[str, Any]:
+        return {"file_id": str(self.fs.put(blob, filename=key))}
+
+    def get(self, ref: Dict[str, Any]) -> bytes:
+        from bson import ObjectId
+        return self.fs.get(ObjectId(ref["file_id"])).read()
+
+
+class MinioBlobStore:
+    """Store blobs in the configured MinIO bucket."""
+
+    kind = "minio"
+
+    def __init__(self, minio_payload: Dict[str, Any], session=None):
+        self.minio_payload = minio_payload
+        self.session = session
+
+    def put(self, key: str, blob: bytes) -> Dict[str, Any]:
+        result = save_bytes_to_minio(blob, key, self.minio_payload, session=self.session)
+        if not result.get("ok"):
+            raise RuntimeError(result.get("message"))
+        return {"bucket": result["bucket"], "key": key}
+
+    def get(self, ref: Dict[str, Any]) -> bytes:
+        return load_bytes_from_minio(ref["key"], self.minio_payload, bucket=ref.get("bucket", ""), session=self.session)
+
+
+class ColumnarMetricsWriter:
+    """Store each metric column as compressed array segments instead of BSON points.
+
+    Every ``add`` call (one per streamed chunk, or one per column when the
+    whole file is read) is encoded and uploaded right away as one values
+    blob and one steps blob, so memory stays bounded by the chunk size.
+    ``info["metric_arrays"]["columns"]`` is a list of ``{"name", "length",
+    "step_min", "step_max", "segments"}`` entries, the segments in order; a
+    list because metric names may contain dots, which Mongo field names
+    cannot. Use ``load_metric_arrays`` to read them back.
+    """
+
+    def __init__(self, store, info: Dict[str, Any], prefix: str):
+        self.store = store
+        self.info = info
+        self.prefix = prefix.rstrip("/")
+        self._next_step: Dict[str, int] = {}
+        self._columns: Dict[str, Dict[str, Any]] = {}
+        self.documents_written = 0
+        self.points_written = 0
+
+    def _section(self) -> Dict[str, Any]:
+        return self.info.setdefault("metric_arrays", {"format": FORMAT, "storage": self.store.kind, "columns": []})
+
+    def add(self, name: str, values: Iterable[Any], steps: Optional[Iterable[Any]] = None) -> None:
+        values = _as_array(values)
+        if not len(values):
+            return
+        if steps is None:
+            start = self._next_step.get(name, 0)
+            steps = np.arange(start, start + len(values))
+            self._next_step[name] = start + len(values)
+        steps = _as_array(steps)
+        if len(steps) != len(values):
+            raise ValueError(f"Metric {name}: {len(steps)} steps for {len(values)} values")
+        entry = self._columns.get(name)
+        if entry is None:
+            entry = self._columns[name] = {"name": name, "length": 0, "segments": []}
+            self._section()["columns"].append(entry)
+        key = f"{self.prefix}/{quote(name, safe='')}.{len(entry['segments']):05d}"
+        entry["segments"].append({
+            "length": int(len(values)),
+            "values": self._put(f"{key}.values.npy", values),
+            "steps": self._put(f"{key}.steps.npy", steps),
+        })
+        if not entry["length"]:
+            entry["step_min"] = steps[0].item()
+        entry["step_max"] = steps[-1].item()
+        entry["length"] += int(len(values))
+        self.points_written += len(values)
+
+    def _put(self, key: str, arr: np.ndarray) -> Dict[str, Any]:
+        blob, descriptor = encode_array(arr)
+        descriptor["ref"] = self.store.put(key, blob)
+        self.documents_written += 1
+        return descriptor
+
+    def flush(self) -> Dict[str, Any]:
+        """The ``metric_arrays`` section (segments are written by ``add``)."""
+        return self._section()
+
+
+def load_metric_arrays(
+    info: Dict[str, Any],
+    database=None,
+    minio_payload: Optional[Dict[str, Any]] = None,
+    names: Optional[Iterable[str]] = None,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Read back the arrays described in a run's ``info["metric_arrays"]``.
+
+    ``database`` (a pymongo Database) is needed for GridFS storage,
+    ``minio_payload`` for MinIO storage. Returns {name: (steps, values)},
+    the segments of each column concatenated.
+    """
+    section = (info or {}).get("metric_arrays") or {}
+    if section.get("storage") == "minio":
+        store = MinioBlobStore(minio_payload or {}, session=MinioSession(minio_payload or {}))
+    else:
+        import gridfs
+        store = GridFSBlobStore(gridfs.GridFS(database))
+    columns = {entry["name"]: entry for entry in section.get("columns") or []}
+    wanted = list(names) if names is not None else list(columns)
+    out = {}
+    for name in wanted:
+        entry = columns[name]
+        segments = entry.get("segments") or [entry]  # single-blob layout of earlier runs
+        steps = [decode_array(store.get(seg["steps"]["ref"]), seg["steps"]) for seg in segments]
+        values = [decode_array(store.get(seg["values"]["ref"]), seg["values"]) for seg in segments]
+        out[name] = (np.concatenate(steps), np.concatenate(values))
+    if isinstance(store, MinioBlobStore):
+        store.session.close()
+    return out
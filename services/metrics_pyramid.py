@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_LEVELS = (1_000, 10_000, 100_000)
+
+
+def minmax_downsample(steps: np.ndarray, values: np.ndarray, target: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the min and the max of each bucket, in step order.
+
+    Returns at most ``target`` points; spikes stay visible at any zoom level,
+    unlike plain decimation. Fully vectorized: the series is padded to equal
+    buckets and reduced along one axis.
+    """
+    n = len(values)
+    buckets = max(1, target // 2)
+    if n <= target:
+        return steps, values
+    width = -(-n // buckets)  # ceil
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = values
+    grid = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    imin = np.where(np.isnan(grid), np.inf, grid).argmin(axis=1) + offsets
+    imax = np.where(np.isnan(grid), -np.inf, grid).argmax(axis=1) + offsets
+    idx = np.sort(np.stack([imin, imax], axis=1), axis=1).ravel()
+    # drop duplicates (flat buckets) and positions falling in the padding
+    keep = np.ones(len(idx), dtype=bool)
+    keep[1:] = idx[1:] != idx[:-1]
+    idx = idx[keep & (idx < n)]
+    return steps[idx], values[idx]
+
+
+def _bucket_extremes(values: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of the min and the max of each ``width``-point bucket (NaNs ignored)."""
+    grid = values.reshape(-1, width)
+    offsets = np.arange(grid.shape[0]) * width
+    nan = np.isnan(grid)
+    imin = np.where(nan, np.inf, grid).argmin(axis=1) + offsets
+    imax = np.where(nan, -np.inf, grid).argmax(axis=1) + offsets
+    return imin, imax
+
+
+class _Extremes:
+    """Per-bucket min and max points: global index, step, value, and NaN-free sort key."""
+
+    __slots__ = ("index", "step", "value", "key")
+
+    def __init__(self, index, step, value, key):
+        self.index, self.step, self.value, self.key = index, step, value, key
+
+    @classmethod
+    def empty(cls) -> "_Extremes":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def pick(cls, index, steps, values, positions, fill: float) -> "_Extremes":
+        value = values[positions]
+        return cls(index[positions], steps[positions], value, np.where(np.isnan(value), fill, value))
+
+    def copy(self) -> "_Extremes":
+        return _Extremes(self.index, self.step, self.value, self.key)
+
+    def extend(self, other: "_Extremes") -> None:
+        if not len(self.index):
+            # keeps the dtype of the steps (np.empty would turn int steps into floats)
+            self.index, self.step, self.value, self.key = other.index, other.step, other.value, other.key
+            return
+        self.index = np.concatenate([self.index, other.index])
+        self.step = np.concatenate([self.step, other.step])
+        self.value = np.concatenate([self.value, other.value])
+        self.key = np.concatenate([self.key, other.key])
+
+    def group(self, size: int, lowest: bool) -> "_Extremes":
+        """Reduce every ``size`` consecutive buckets to one (the last group may be partial)."""
+        fill = np.inf if lowest else -np.inf
+        count = len(self.key)
+        groups = -(-count // size)
+        key = np.full(groups * size, fill)
+        key[:count] = self.key
+        grid = key.reshape(groups, size)
+        chosen = (grid.argmin(axis=1) if lowest else grid.argmax(axis=1)) + np.arange(groups) * size
+        # a padded slot only wins in a group that is all padding, which cannot happen
+        chosen = np.minimum(chosen, count - 1)
+        return _Extremes(self.index[chosen], self.step[chosen], self.value[chosen], self.key[chosen])
+
+
+class PyramidBuilder:
+    """Build downsampled levels of one metric series, chunk by chunk.
+
+    Points are reduced into fixed-width buckets of the point index, keeping
+    the min and max of each. When there are ``4 * max(levels)`` buckets,
+    neighbouring pairs are merged and the width doubles, for old and new data
+    alike, so memory stays bounded and every bucket of the series covers the
+    same number of points. A level then groups whole buckets the way
+    ``minmax_downsample`` would group the points of the full series.
+    """
+
+    def __init__(self, levels: Sequence[int] = DEFAULT_LEVELS):
+        self.levels = sorted({int(level) for level in levels if int(level) > 1})
+        self._capacity = 4 * max(self.levels) if self.levels else 0
+        self._width = 1
+        self._min = _Extremes.empty()
+        self._max = _Extremes.empty()
+        # points not yet filling a whole bucket
+        self._pending_steps = np.empty(0)
+        self._pending_values = np.empty(0)
+        self.points = 0
+        self.enabled = bool(self.levels)
+
+    def add(self, steps: Sequence[Any], values: Sequence[Any]) -> None:
+        if not self.enabled:
+            return
+        try:
+            values = np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            # non-numeric series: nothing meaningful to downsample
+            self.enabled = False
+            return
+        start = self.points - len(self._pending_values)
+        if len(self._pending_values):
+            self._pending_steps = np.concatenate([self._pending_steps, np.asarray(steps)])
+            self._pending_values = np.concatenate([self._pending_values, values])
+        else:
+            self._pending_steps, self._pending_values = np.asarray(steps), values
+        self.points += len(values)
+        taken = 0
+        while len(self._pending_values) - taken >= self._width:
+            free = self._capacity - len(self._min.key)
+            count = min(free, (len(self._pending_values) - taken) // self._width) * self._width
+            self._reduce(start + taken, taken, count)
+            taken += count
+            if len(self._min.key) == self._capacity:
+                self._merge_pairs()
+        self._pending_steps = self._pending_steps[taken:]
+        self._pending_values = self._pending_values[taken:]
+
+    def _reduce(self, first_index: int, offset: int, count: int) -> None:
+        steps = self._pending_steps[offset:offset + count]
+        values = self._pending_values[offset:offset + count]
+        index = np.arange(first_index, first_index + count)
+        imin, imax = _bucket_extremes(values, self._width)
+        self._min.extend(_Extremes.pick(index, steps, values, imin, np.inf))
+        self._max.extend(_Extremes.pick(index, steps, values, imax, -np.inf))
+
+    def _merge_pairs(self) -> None:
+        self._min = self._min.group(2, lowest=True)
+        self._max = self._max.group(2, lowest=False)
+        self._width *= 2
+
+    def build(self) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+        """Return (level, steps, values) for every level coarser than the series."""
+        if not self.enabled or not self.points:
+            return []
+        lows, highs = self._min.copy(), self._max.copy()
+        if len(self._pending_values):
+            # the trailing partial bucket
+            index = np.arange(self.points - len(self._pending_values), self.points)
+            imin, imax = _bucket_extremes(self._pending_values, len(self._pending_values))
+            lows.extend(_Extremes.pick(index, self._pending_steps, self._pending_values, imin, np.inf))
+            highs.extend(_Extremes.pick(index, self._pending_steps, self._pending_values, imax, -np.inf))
+        out = []
+        for level in self.levels:
+            if level >= self.points:
+                continue
+            # same bucket width as minmax_downsample on the whole series,
+            # rounded up to whole buckets so at most ``level`` points remain
+            width = -(-self.points // max(1, level // 2))
+            size = max(1, -(-width // self._width))
+            low, high = lows.group(size, lowest=True), highs.group(size, lowest=False)
+            order = np.argsort(np.concatenate([low.index, high.index]), kind="stable")
+            steps = np.concatenate([low.step, high.step])[order]
+            values = np.concatenate([low.value, high.value])[order]
+            index = np.concatenate([low.index, high.index])[order]
+            keep = np.ones(len(index), dtype=bool)
+            keep[1:] = index[1:] != index[:-1]
+            out.append((level, steps[keep], values[keep]))
+        return out
+
+
+def write_pyramids(writer, builders: Dict[str, PyramidBuilder], info: Dict[str, Any]) -> int:
+    """Store every level through ``writer`` and index them in ``info``.
+
+    Levels are saved as ``<metric>@<level>`` metric documents that are not
+    listed in ``info["metrics"]`` (so they do not show up as extra metrics).
+    ``info["metric_pyramids"]`` is a list of ``{"name", "points", "levels"}``
+    entries, one per metric, whose levels run coarse to fine with their
+    document ids; a list because metric names may contain dots, which Mongo
+    field names cannot. Returns the number of levels written.
+    """
+    pyramids = info.setdefault("metric_pyramids", [])
+    written = 0
+    for name, builder in builders.items():
+        entries = []
+        for level, steps, values in builder.build():
+            level_name = f"{name}@{level}"
+            ids = writer.add(level_name, values.tolist(), steps=steps.tolist(), link=False)
+            entries.append({"level": level, "points": len(values), "name": level_name, "ids": ids})
+            written += 1
+        if entries:
+            pyramids.append({"name": name, "points": builder.points, "levels": entries})
+    return written
+
+
+def pyramid_levels(options: Dict[str, Any]) -> Optional[Sequence[int]]:
+    """Levels requested by the metrics options, or None when disabled."""
+    if not options.get("pyramid"):
+        return None
+    levels = options.get("pyramid_levels") or DEFAULT_LEVELS
+    return [int(level) for level in levels]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import bson
+
+# MongoDB rejects documents above 16 MB; keep headroom for the envelope
+# (run_id, name, _id) and for the insert message itself.
+BSON_DOCUMENT_LIMIT = 16 * 1024 * 1024
+DEFAULT_CHUNK_BYTES = 12 * 1024 * 1024
+
+# Upper bound of one numeric array element in BSON: type byte + index key
+# ("1234567\0") + 8 bytes payload. Used to size the first chunk guess.
+_NUMERIC_ELEMENT_BYTES = 1 + 8 + 8
+# Index keys of points appended to a document are longer than in the part
+# encoded on its own: allow this many extra bytes per point and array.
+_APPEND_KEY_BYTES = 3 * 7
+
+
+class BulkMetricsWriter:
+    """Write metrics straight to Sacred's ``metrics`` collection.
+
+    Documents have the same shape as the ones produced by
+    ``MongoObserver.log_metrics`` (``run_id``, ``name``, ``steps``, ``values``,
+    ``timestamps``), one per metric: later parts of a series (streamed
+    chunks) are appended to it with ``$push``, and ``run.info["metrics"]``
+    gets a single ``{"name", "id"}`` entry per metric, as with Sacred.
+    Only when a document would grow past ``chunk_bytes`` does the series
+    continue in a new document with the same ``run_id`` and ``name``; those
+    overflow documents are not listed in ``info["metrics"]``, so Omniboard
+    shows the first part only and readers should query by run_id and name.
+    """
+
+    def __init__(self, metrics_collection, run_id, info: Dict[str, Any], chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        self.metrics = metrics_collection
+        self.run_id = run_id
+        self.info = info
+        self.chunk_bytes = min(int(chunk_bytes), BSON_DOCUMENT_LIMIT)
+        self._next_step: Dict[str, int] = {}
+        # metric name -> [id, encoded size] of the document still taking points
+        self._open: Dict[str, list] = {}
+        self.documents_written = 0
+        self.points_written = 0
+
+    def add(self, name: str, values: Sequence[Any], steps: Optional[Sequence[Any]] = None, link: bool = True) -> List[str]:
+        """Write one series (or the next part of it) for metric ``name``.
+
+        Without ``steps`` the points are numbered like ``Run.log_scalar`` does,
+        continuing from the last step written for that metric. With
+        ``link=False`` the documents are not listed in ``info["metrics"]``.
+        Returns the ids of the documents written to, first to last.
+        """
+        values = list(values)
+        if not values:
+            return []
+        if steps is None:
+            start = self._next_step.get(name, 0)
+            steps = range(start, start + len(values))
+        steps = list(steps)
+        if len(steps) != len(values):
+            raise ValueError(f"Metric {name}: {len(steps)} steps for {len(values)} values")
+        if isinstance(steps[-1], int):
+            self._next_step[name] = steps[-1] + 1
+
+        parts = []
+        size = max(1, self.chunk_bytes // (3 * _NUMERIC_ELEMENT_BYTES))
+        for start in range(0, len(values), size):
+            parts.extend(self._fit(name, steps[start:start + size], values[start:start + size]))
+        return self._write(name, parts, link)
+
+    def _fit(self, name: str, steps: List[Any], values: List[Any]) -> List[Tuple[Dict[str, Any], int]]:
+        """Return (document, encoded size) for ``steps``/``values``, halving until each fits."""
+        now = datetime.datetime.utcnow()
+        doc = {
+            "run_id": self.run_id,
+            "name": name,
+            "steps": steps,
+            "values": values,
+            "timestamps": [now] * len(values),
+        }
+        encoded = len(bson.encode(doc))
+        if len(values) == 1 or encoded <= self.chunk_bytes:
+            return [(doc, encoded)]
+        half = len(values) // 2
+        return self._fit(name, steps[:half], values[:half]) + self._fit(name, steps[half:], values[half:])
+
+    def _write(self, name: str, parts: List[Tuple[Dict[str, Any], int]], link: bool = True) -> List[str]:
+        ids: List[str] = []
+        new_docs = []
+        for doc, encoded in parts:
+            current = self._open.get(name)
+            grown = encoded + _APPEND_KEY_BYTES * len(doc["values"])
+            if current is not None and not new_docs and current[1] + grown <= self.chunk_bytes:
+                self.metrics.update_one(
+                    {"_id": current[0]},
+                    {"$push": {key: {"$each": doc[key]} for key in ("steps", "values", "timestamps")}},
+                )
+                current[1] += grown
+                if not ids:
+                    ids.append(str(current[0]))
+            else:
+                new_docs.append((doc, encoded))
+            self.points_written += len(doc["values"])
+        if new_docs:
+            result = self.metrics.insert_many([doc for doc, _ in new_docs], ordered=True)
+            if link and name not in self._open:
+                self.info.setdefault("metrics", []).append({"name": name, "id": str(result.inserted_ids[0])})
+            self._open[name] = [result.inserted_ids[-1], new_docs[-1][1]]
+            ids.extend(str(inserted_id) for inserted_id in result.inserted_ids)
+            self.documents_written += len(new_docs)
+        return ids
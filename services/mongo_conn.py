@@ -97,4 +97,35 @@ def build_mongo_url_from_payload(mongo_payload: dict) -> tuple[str, str]:
         params.append("tls=true")
     query = ("?" + "&".join(params)) if params else ""
     mongo_url = f"mongodb://{auth}{host}:{port}/{db_name}{query}"
-    return mongo_url, db_name
\ No newline at end of file
+    return mongo_url, db_name
+
+class BatchMongoClient:
+    """One pooled MongoClient shared by every run of a send batch.
+
+    Sacred's MongoObserver accepts an existing client, so every folder reuses
+    the same connection pool instead of paying a new TLS handshake,
+    authentication and monitoring threads per experiment. Close it (or use it
+    as a context manager) when the batch ends.
+    """
+
+    def __init__(self, mongo_url: str, db_name: str, **client_kwargs):
+        client_kwargs.setdefault("appname", "ExperimentSenderSacred")
+        self.db_name = db_name
+        self.client = ClientWithAddress(mongo_url, address_string=mongo_url, **client_kwargs)
+
+    @property
+    def database(self):
+        return self.client[self.db_name]
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
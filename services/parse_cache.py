@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from services.prefs import STATE_DIR
+
+DEFAULT_CACHE_DIR = STATE_DIR / "parse_cache"
+DEFAULT_MAX_MB = 2048
+# entries pickling to more than this share of max_bytes are not cached
+MAX_ENTRY_FRACTION = 0.25
+
+
+class ParseCache:
+    """On-disk cache of parsed tables (DataFrames), one pickle per entry.
+
+    Entries are keyed by the file's absolute path, size and mtime plus the
+    reader and its options, so an edited file is parsed again. Hits refresh
+    the entry's mtime; once the directory grows past ``max_bytes`` the least
+    recently used entries are evicted (never the one just written). Tables
+    larger than ``MAX_ENTRY_FRACTION`` of ``max_bytes`` are not cached, so
+    one huge file cannot flush everything else. Writes go through a
+    temporary file and a rename, so concurrent senders never read a
+    partial entry.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = Path(directory or DEFAULT_CACHE_DIR)
+        self.max_bytes = int(max_bytes)
+
+    def _entry_path(self, file_path: str, reader: str, options: dict) -> Path:
+        st = os.stat(file_path)
+        key = json.dumps(
+            [os.path.abspath(file_path), st.st_size, st.st_mtime_ns, reader, options],
+            sort_keys=True,
+            default=str,
+        )
+        return self.directory / (hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + ".pkl")
+
+    def read(self, file_path: str, reader: str, parse: Callable[..., Any], **options) -> Any:
+        """Return ``parse(file_path, **options)``, from the cache when possible."""
+        entry = self._entry_path(file_path, reader, options)
+        try:
+            with open(entry, "rb") as f:
+                value = pickle.load(f)
+            os.utime(entry)
+            return value
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass
+        value = parse(file_path, **options)
+        try:
+            self._store(entry, value)
+        except OSError as e:
+            print(f"Could not cache parsed {file_path}: {e}")
+        return value
+
+    def _store(self, entry: Path, value: Any) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            if size > self.max_bytes * MAX_ENTRY_FRACTION:
+                return
+            os.replace(tmp, entry)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.evict(keep=entry)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Drop least recently used entries until the cache fits ``max_bytes``.
+
+        ``keep`` (the entry just written) is never dropped.
+        """
+        entries = []
+        total = 0
+        keep_name = keep.name if keep is not None else None
+        for item in os.scandir(self.directory):
+            if not item.name.endswith(".pkl"):
+                continue
+            try:
+                st = item.stat()
+            except OSError:
+                continue
+            total += st.st_size
+            if item.name != keep_name:
+                entries.append((st.st_mtime_ns, st.st_size, item.path))
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
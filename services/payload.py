@@ -0,0 +1,103 @@
+from typing import Any, Dict
+
+
+def build_payload(data: Dict[str, Any], password: str = "", minio_secret: str = "") -> Dict[str, Any]:
+    """Build the send_experiment payload from a flat preferences dict.
+
+    ``data`` has the shape saved in the preferences file (see
+    ``AppView.prefs_dict``). Secrets are never stored there, so they are
+    passed separately.
+    """
+    return {
+        "mongo": {
+            "use_uri": data.get("use_uri", 0),
+            "uri": data.get("uri", ""),
+            "host": data.get("host", ""),
+            "port": data.get("port", ""),
+            "user": data.get("user", ""),
+            "db": data.get("db", ""),
+            "tls": data.get("tls", 0),
+            "password": password,
+        },
+        "minio": {
+            "endpoint": data.get("minio_endpoint", ""),
+            "access_key": data.get("minio_access_key", ""),
+            "tls": data.get("minio_tls", 0),
+            "secret_key": minio_secret,
+            "bucket": data.get("minio_bucket", ""),
+        },
+        "experiment": {
+            "folder": data.get("experiment_folder", ""),
+            "name": data.get("experiment_name", ""),
+            "folders": data.get("experiment_folders", []),
+            "options": {
+                "workers": data.get("send_workers", 1),
+                "resume": data.get("send_resume", 0),
+                "journal": data.get("send_journal", ""),
+                "sync": data.get("send_sync", 0),
+                "environment": data.get("send_environment", "batch"),
+                "pipeline": data.get("send_pipeline", 1),
+                "parse_cache": data.get("send_parse_cache", 1),
+                "parse_cache_mb": data.get("send_parse_cache_mb", 2048),
+            },
+            "selectors": {
+                "config": {
+                    "name": data.get("config_name", ""),
+                    "sheet": data.get("config_sheet", ""),
+                    "options": {
+                        "flatten": data.get("config_flatten", 0),
+                        "sep": data.get("config_sep", ","),
+                    },
+                },
+                "metrics": {
+                    "name": data.get("metrics_name", ""),
+                    "sheet": data.get("metrics_sheet", ""),
+                    "options": {
+                        "header": data.get("metrics_header", 0),
+                        "has_time": data.get("metrics_has_time", 0),
+                        "time_col": data.get("metrics_time_col", ""),
+                        "selected_cols": data.get("metrics_selected_cols", []),
+                        "sep": data.get("metrics_sep", ","),
+                        "write_mode": data.get("metrics_write_mode", "log_scalar"),
+                        "columnar_store": data.get("metrics_columnar_store", "gridfs"),
+                        "streaming": data.get("metrics_streaming", 0),
+                        "chunk_rows": data.get("metrics_chunk_rows", 100000),
+                        "pyramid": data.get("metrics_pyramid", 0),
+                        "pyramid_levels": data.get("metrics_pyramid_levels", [1000, 10000, 100000]),
+                    },
+                },
+                "results": {
+                    "name": data.get("results_name", ""),
+                    "sheet": data.get("results_sheet", ""),
+                    "options": {
+                        "sep": data.get("results_sep", ","),
+                    },
+                },
+                "raw_data": {
+                    "name": data.get("raw_data_name", ""),
+                    "files": data.get("raw_data_files", []),
+                    "options": {
+                        "send_minio": data.get("raw_data_send_minio", 1),
+                        "save_locally": data.get("raw_data_save_locally", 0),
+                        "local_path": data.get("raw_data_local_path", ""),
+                        "upload_workers": data.get("raw_data_upload_workers", 4),
+                        "multipart_chunk_mb": data.get("raw_data_multipart_chunk_mb", 16),
+                        "per_file_concurrency": data.get("raw_data_per_file_concurrency", 4),
+                        "dedupe": data.get("raw_data_dedupe", 0),
+                        "local_strategy": data.get("raw_data_local_strategy", "auto"),
+                        "local_workers": data.get("raw_data_local_workers", 4),
+                        "compression": data.get("raw_data_compression", ""),
+                        "compression_level": data.get("raw_data_compression_level"),
+                    },
+                },
+                "artifacts": {
+                    "name": data.get("artifacts_name", ""),
+                    "files": data.get("artifacts_files", []),
+                    "options": {
+                        "minio_threshold_mb": data.get("artifacts_minio_threshold_mb", 0),
+                        "content_addressed": data.get("artifacts_content_addressed", 0),
+                    },
+                },
+            },
+        },
+    }
@@ -7,6 +7,8 @@ except ImportError:
     keyring = None
 
 CONFIG_PATH = Path.home() / ".mongoui_config.json"
+# Local state kept between sends (journals, indexes, caches)
+STATE_DIR = Path.home() / ".experiment_sender"
 KEYRING_SERVICE = "MongoDBLoginCustomTk"
 
 class Preferences:
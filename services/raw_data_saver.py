@@ -1,10 +1,22 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import shutil
+import threading
+import time
 import os
 
+from services.checksums import ChecksumCache, build_manifest
+from services.local_copy import place_file
+from services.compression import CompressingReader, plan_compression, resolve_codec
+
+# Upload tuning defaults (overridable through the raw-data options)
+DEFAULT_UPLOAD_WORKERS = 4
+DEFAULT_MULTIPART_CHUNK_MB = 16
+DEFAULT_PER_FILE_CONCURRENCY = 4
+
 
 def _build_minio_endpoint_url(endpoint: str, use_tls: bool) -> str:
     ep = (endpoint or "").strip()
@@ -24,29 +36,65 @@ def format_size(size_bytes):
         return f"{size_bytes / 1024**3:.2f} Go"
 
 
-def save_files_locally(files, target_dir) -> Dict[str, Any]:
+def _part_bytes(chunk_mb) -> int:
+    # S3 minimum part size is 5 MB
+    return max(5, int(chunk_mb or DEFAULT_MULTIPART_CHUNK_MB)) * 1024 * 1024
+
+
+def save_files_locally(files, target_dir, manifest=None, strategy: str = "auto", workers: int = DEFAULT_UPLOAD_WORKERS) -> Dict[str, Any]:
     """Copy files to a local directory.
 
-    Returns a result dict with counts and per-file status.
+    Returns a result dict with counts and per-file status. ``strategy`` is
+    one of ``local_copy.STRATEGIES`` or "auto" (reflink, then hardlink, then
+    copy_file_range, then a plain copy); the strategy used is reported per
+    file. With a ``manifest`` (see ``build_raw_data_manifest``), a target
+    that already has the source's size and mtime is left as is.
     """
-    for file in files.values():
-        target_dir = f"{target_dir}/{file['minio_folder']}"
-        os.makedirs(target_dir, exist_ok=True)
-        shutil.copy2(file['source_path'], f"{target_dir}/{file['new_name']}")
-    return {"ok": True, "message": f"Saved {len(files)} files locally to {target_dir}"}
 
+    def place(file) -> Dict[str, Any]:
+        folder = f"{target_dir}/{file['minio_folder']}"
+        target = f"{folder}/{file['new_name']}"
+        detail = {"file": file['source_path'], "target": target, "ok": False, "strategy": "", "bytes": 0, "seconds": 0.0, "error": ""}
+        start = time.perf_counter()
+        try:
+            os.makedirs(folder, exist_ok=True)
+            entry = (manifest or {}).get(file['source_path'])
+            detail["bytes"] = entry["size"] if entry is not None else os.path.getsize(file['source_path'])
+            try:
+                st = os.stat(target)
+                up_to_date = entry is not None and st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]
+            except OSError:
+                up_to_date = False
+            detail["strategy"] = "skipped" if up_to_date else place_file(file['source_path'], target, strategy)
+            detail["ok"] = True
+        except Exception as e:
+            detail["error"] = str(e)
+        detail["seconds"] = round(time.perf_counter() - start, 3)
+        return detail
 
-def save_files_to_minio(files, minio_payload) -> Dict[str, Any]:
-    """Upload files to a MinIO/S3 bucket using boto3.
+    with ThreadPoolExecutor(max_workers=max(1, int(workers or 1)), thread_name_prefix="local-save") as pool:
+        details = list(pool.map(place, files.values()))
 
-    minio_payload must contain: endpoint, access_key, secret_key, bucket, tls (0/1 or bool)
-    """
+    failed = [d for d in details if not d["ok"]]
+    used: Dict[str, int] = {}
+    for d in details:
+        if d["ok"]:
+            used[d["strategy"]] = used.get(d["strategy"], 0) + 1
+    message = f"Saved {len(details) - len(failed)}/{len(details)} files locally to {target_dir}"
+    if used:
+        message += " (" + ", ".join(f"{name}: {count}" for name, count in sorted(used.items())) + ")"
+    for d in failed:
+        message += f" | {d['target']} failed: {d['error']}"
+    return {"ok": not failed, "message": message, "saved": len(details) - len(failed), "failed": len(failed), "details": details}
+
+
+def _minio_client(minio_payload, max_pool_connections: int = 10):
+    """Return ``(s3_client, bucket)`` for a MinIO payload; raises on bad settings."""
     try:
         import boto3  # type: ignore
         from botocore.config import Config  # type: ignore
-        from botocore.exceptions import ClientError  # type: ignore
     except Exception as e:
-        return {"ok": False, "message": f"boto3 not available: {e}", "uploaded": 0, "failed": len(files or []), "details": []}
+        raise RuntimeError(f"boto3 not available: {e}")
 
     endpoint = _build_minio_endpoint_url(minio_payload.get("endpoint", ""), bool(minio_payload.get("tls", 0)))
     access_key = (minio_payload.get("access_key") or "").strip()
@@ -54,34 +102,293 @@ def save_files_to_minio(files, minio_payload) -> Dict[str, Any]:
     bucket = (minio_payload.get("bucket") or "").strip()
 
     if not endpoint or not access_key or not secret_key or not bucket:
-        return {"ok": False, "message": "Missing MinIO credentials or bucket", "uploaded": 0, "failed": len(files or []), "details": []}
+        raise ValueError("Missing MinIO credentials or bucket")
 
     s3 = boto3.client(
         "s3",
         endpoint_url=endpoint,
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
-        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        config=Config(
+            signature_version="s3v4",
+            s3={"addressing_style": "path"},
+            max_pool_connections=max_pool_connections,
+        ),
     )
-    # Verify bucket exists
+    return s3, bucket
+
+
+class MinioSession:
+    """One S3 client and bucket check shared by every folder of a batch.
+
+    The client (and its connection pool) is built on first use and is
+    thread-safe, so upload threads share it too. The bucket is verified once;
+    a failed check is retried on the next use. Close it (or use it as a
+    context manager) when the batch ends.
+    """
+
+    def __init__(self, minio_payload, max_pool_connections: int = 10):
+        self.minio_payload = minio_payload or {}
+        self.max_pool_connections = max(10, int(max_pool_connections or 10))
+        self._client = None
+        self._bucket = ""
+        self._bucket_checked = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        with self._lock:
+            if self._client is None:
+                self._client, self._bucket = _minio_client(self.minio_payload, max_pool_connections=self.max_pool_connections)
+
+    @property
+    def client(self):
+        self._connect()
+        return self._client
+
+    @property
+    def bucket(self) -> str:
+        self._connect()
+        return self._bucket
+
+    def check_bucket(self) -> None:
+        """Raise if the bucket is not accessible; only calls S3 until it succeeds once."""
+        if self._bucket_checked:
+            return
+        self.client.head_bucket(Bucket=self.bucket)
+        self._bucket_checked = True
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+            self._bucket_checked = False
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def save_bytes_to_minio(data: bytes, key: str, minio_payload, metadata=None, session: MinioSession = None) -> Dict[str, Any]:
+    """Upload an in-memory blob to ``key`` in the configured bucket."""
+    session = session or MinioSession(minio_payload)
     try:
-        s3.head_bucket(Bucket=bucket)
+        session.client.put_object(Bucket=session.bucket, Key=key, Body=data, Metadata=metadata or {})
     except Exception as e:
-        return {"ok": False, "message": f"Bucket not accessible: {e}", "uploaded": 0, "failed": len(files or []), "details": []}
+        return {"ok": False, "message": f"Upload of {key} failed: {e}"}
+    return {"ok": True, "message": f"Uploaded {key} to MinIO bucket {session.bucket}", "bucket": session.bucket, "key": key}
 
-    for file in files.values():
-        s3.upload_file(file['source_path'], bucket, f"{file['minio_folder']}/{file['new_name']}")
-    return {"ok": True, "message": f"Uploaded {len(files)} files to MinIO bucket {bucket}"}
 
+def load_bytes_from_minio(key: str, minio_payload, bucket: str = "", session: MinioSession = None) -> bytes:
+    """Download a blob saved by ``save_bytes_to_minio``."""
+    session = session or MinioSession(minio_payload)
+    obj = session.client.get_object(Bucket=bucket or session.bucket, Key=key)
+    return obj["Body"].read()
+
+
+def _head_object(s3, bucket: str, key: str):
+    """Metadata of ``key``, or None when the object does not exist."""
+    from botocore.exceptions import ClientError  # type: ignore
+    try:
+        return s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if str(e.response.get("Error", {}).get("Code")) in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+def _same_object(head: Dict[str, Any], size: int, sums: Dict[str, str], codec=None) -> bool:
+    meta = head.get("Metadata") or {}
+    if codec:
+        # compressed objects are compared on the original content they hold
+        return meta.get("codec") == codec and meta.get("original-size") == str(size) and meta.get("sha256") == sums["sha256"]
+    if head.get("ContentLength") != size:
+        return False
+    remote_sha = meta.get("sha256")
+    if remote_sha:
+        return remote_sha == sums["sha256"]
+    etag = (head.get("ETag") or "").strip('"')
+    # multipart ETags only match when the part size was the same
+    return etag == (sums["etag"] if "-" in etag else sums["md5"])
+
+
+def save_files_to_minio(
+    files,
+    minio_payload,
+    workers: int = DEFAULT_UPLOAD_WORKERS,
+    chunk_mb: int = DEFAULT_MULTIPART_CHUNK_MB,
+    per_file_concurrency: int = DEFAULT_PER_FILE_CONCURRENCY,
+    dedupe: bool = False,
+    manifest=None,
+    session: MinioSession = None,
+    compression: str = "",
+    compression_level=None,
+) -> Dict[str, Any]:
+    """Upload files to a MinIO/S3 bucket using boto3.
+
+    minio_payload must contain: endpoint, access_key, secret_key, bucket, tls (0/1 or bool)
+
+    ``workers`` files are uploaded at once; files above ``chunk_mb`` are
+    sent as multipart uploads of ``chunk_mb`` parts with up to
+    ``per_file_concurrency`` parts in flight. The result lists every file
+    under ``details`` with its status, size and duration.
 
-def save_raw_data(files, raw_data_save_options, minio_payload):
+    With ``dedupe`` every object is uploaded with its sha256 in the object
+    metadata, and a file whose key already holds the same content (same
+    sha256 metadata, or same ETag for objects uploaded without it) is
+    skipped and reported with status "skipped". A ``manifest`` provides the
+    sizes and checksums so files are not read again; objects are then always
+    tagged with their sha256. Pass the batch's ``session`` to reuse its
+    client and bucket check; without one a client is built for this call.
+
+    ``compression`` ("gzip" or "zstd", at ``compression_level``) compresses
+    files while they are uploaded, without temporary files. Each file is
+    probed first and sent as-is if its first blocks do not shrink. Compressed
+    objects get the codec suffix (".gz", ".zst") and record the codec and
+    original size in their metadata. Each detail reports ``codec`` and
+    ``stored_bytes``.
+    """
+    try:
+        from boto3.s3.transfer import TransferConfig  # type: ignore
+    except Exception as e:
+        return {"ok": False, "message": f"boto3 not available: {e}", "uploaded": 0, "failed": len(files or []), "details": []}
+    try:
+        codec = resolve_codec(compression)
+    except ValueError as e:
+        return {"ok": False, "message": str(e), "uploaded": 0, "failed": len(files or []), "details": []}
+
+    workers = max(1, int(workers or 1))
+    per_file_concurrency = max(1, int(per_file_concurrency or 1))
+    chunk_bytes = _part_bytes(chunk_mb)
+    transfer = TransferConfig(
+        multipart_threshold=chunk_bytes,
+        multipart_chunksize=chunk_bytes,
+        max_concurrency=per_file_concurrency,
+        use_threads=per_file_concurrency > 1,
+    )
+    own_session = session is None
+    if own_session:
+        session = MinioSession(minio_payload, max_pool_connections=workers * per_file_concurrency)
+    try:
+        try:
+            s3, bucket = session.client, session.bucket
+        except Exception as e:
+            return {"ok": False, "message": str(e), "uploaded": 0, "failed": len(files or []), "details": []}
+
+        # Verify bucket exists
+        try:
+            session.check_bucket()
+        except Exception as e:
+            return {"ok": False, "message": f"Bucket not accessible: {e}", "uploaded": 0, "failed": len(files or []), "details": []}
+
+        return _upload_files(s3, bucket, files, workers, transfer, chunk_bytes, dedupe, manifest, codec, compression_level)
+    finally:
+        if own_session:
+            session.close()
+
+
+def _upload_files(s3, bucket, files, workers, transfer, chunk_bytes, dedupe, manifest, codec=None, level=None) -> Dict[str, Any]:
+    """Upload ``files`` with a pool of ``workers`` threads; see ``save_files_to_minio``."""
+    checksums = ChecksumCache() if dedupe and manifest is None else None
+
+    def upload(file) -> Dict[str, Any]:
+        key = f"{file['minio_folder']}/{file['new_name']}"
+        detail = {"file": file['source_path'], "key": key, "ok": False, "status": "failed", "bytes": 0, "stored_bytes": 0, "codec": "", "seconds": 0.0, "error": ""}
+        start = time.perf_counter()
+        try:
+            entry = (manifest or {}).get(file['source_path'])
+            detail["bytes"] = entry["size"] if entry is not None else os.path.getsize(file['source_path'])
+            file_codec, suffix = plan_compression(file['source_path'], codec, level) if codec else (None, "")
+            key = detail["key"] = key + suffix
+            detail["codec"] = file_codec or ""
+            metadata = {}
+            sums = entry if entry is not None else (checksums.get(file['source_path'], chunk_bytes) if checksums is not None else None)
+            if sums is not None:
+                metadata["sha256"] = sums["sha256"]
+            if file_codec:
+                metadata.update({"codec": file_codec, "original-size": str(detail["bytes"])})
+            extra = {"Metadata": metadata} if metadata else None
+            if dedupe and sums is not None:
+                remote = _head_object(s3, bucket, key)
+                if remote is not None and _same_object(remote, detail["bytes"], sums, file_codec):
+                    detail["ok"] = True
+                    detail["status"] = "skipped"
+                    detail["stored_bytes"] = remote.get("ContentLength", 0)
+                    detail["seconds"] = round(time.perf_counter() - start, 3)
+                    return detail
+            if file_codec:
+                with CompressingReader(file['source_path'], file_codec, level) as stream:
+                    s3.upload_fileobj(stream, bucket, key, ExtraArgs=extra, Config=transfer)
+                    detail["stored_bytes"] = stream.bytes_out
+            else:
+                s3.upload_file(file['source_path'], bucket, key, ExtraArgs=extra, Config=transfer)
+                detail["stored_bytes"] = detail["bytes"]
+            detail["ok"] = True
+            detail["status"] = "uploaded"
+        except Exception as e:
+            detail["error"] = str(e)
+        detail["seconds"] = round(time.perf_counter() - start, 3)
+        return detail
+
+    start = time.perf_counter()
+    # the boto3 client is thread-safe, so one client serves every upload
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="minio-upload") as pool:
+        details = list(pool.map(upload, files.values()))
+    elapsed = time.perf_counter() - start
+    if checksums is not None:
+        try:
+            checksums.save()
+        except OSError as e:
+            print(f"Could not save checksum cache: {e}")
+
+    uploaded = [d for d in details if d["status"] == "uploaded"]
+    skipped = [d for d in details if d["status"] == "skipped"]
+    failed = [d for d in details if not d["ok"]]
+    total_bytes = sum(d["bytes"] for d in uploaded)
+    rate = f", {format_size(int(total_bytes / elapsed))}/s" if elapsed > 0 and total_bytes else ""
+    message = f"Uploaded {len(uploaded)}/{len(details)} files ({format_size(total_bytes)}) to MinIO bucket {bucket} in {elapsed:.1f} s{rate}"
+    compressed = [d for d in uploaded if d["codec"]]
+    if compressed:
+        message += f", {len(compressed)} compressed to {format_size(sum(d['stored_bytes'] for d in compressed))}"
+    if skipped:
+        message += f", {len(skipped)} already present ({format_size(sum(d['bytes'] for d in skipped))})"
+    for d in failed:
+        message += f" | {d['key']} failed: {d['error']}"
+    return {
+        "ok": not failed,
+        "message": message,
+        "uploaded": len(uploaded),
+        "skipped": len(skipped),
+        "failed": len(failed),
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "details": details,
+    }
+
+
+def save_raw_data(files, raw_data_save_options, minio_payload, minio_session: MinioSession = None, checksum_cache: ChecksumCache = None):
     """High-level helper that saves raw data locally and/or to MinIO based on options.
 
     raw_data_save_options can include:
       - send_minio: bool
       - save_locally: bool
       - local_path: str
+      - upload_workers, multipart_chunk_mb, per_file_concurrency: MinIO upload tuning
+      - dedupe: skip files already present in the bucket with the same content
+      - manifest_workers: threads hashing the files
+      - local_strategy ("auto", "reflink", "hardlink", "copy_file_range", "copy"), local_workers
+      - compression ("", "gzip", "zstd"), compression_level: compress MinIO uploads
+    ``minio_session`` is the batch's shared ``MinioSession`` and
+    ``checksum_cache`` its ``ChecksumCache``, if any.
     Returns a combined status with sub-results under 'minio' and 'local'.
+    Every file is stat'ed and hashed once up front (the manifest); the
+    result feeds both destinations and the returned config.
     """
     send_m = bool(raw_data_save_options.get("send_minio", False))
     save_l = bool(raw_data_save_options.get("save_locally", False))
@@ -91,41 +398,107 @@ def save_raw_data(files, raw_data_save_options, minio_payload):
     messages = []
     config = {}
 
+    if not send_m and not save_l:
+        result["ok"] = True
+        result["message"] = "No raw-data save requested"
+        return result, config
+
+    try:
+        manifest = build_raw_data_manifest(
+            files,
+            chunk_mb=raw_data_save_options.get("multipart_chunk_mb", DEFAULT_MULTIPART_CHUNK_MB),
+            workers=raw_data_save_options.get("manifest_workers", DEFAULT_UPLOAD_WORKERS),
+            cache=checksum_cache,
+        )
+    except OSError as e:
+        return {"ok": False, "message": f"Could not read raw data: {e}", "minio": None, "local": None}, config
+
     if save_l:
-        local_res = save_files_locally(files, local_path)
+        local_res = save_files_locally(
+            files,
+            local_path,
+            manifest=manifest,
+            strategy=raw_data_save_options.get("local_strategy", "auto"),
+            workers=raw_data_save_options.get("local_workers", DEFAULT_UPLOAD_WORKERS),
+        )
         result["local"] = local_res
         result["ok"] = result["ok"] and bool(local_res.get("ok", False))
         messages.append(local_res.get("message", ""))
-        config["local"] = get_config(files, local_path=local_path)
+        config["local"] = get_config(files, local_path=local_path, manifest=manifest)
 
     if send_m:
-        minio_res = save_files_to_minio(files, minio_payload)
+        minio_res = save_files_to_minio(
+            files,
+            minio_payload,
+            workers=raw_data_save_options.get("upload_workers", DEFAULT_UPLOAD_WORKERS),
+            chunk_mb=raw_data_save_options.get("multipart_chunk_mb", DEFAULT_MULTIPART_CHUNK_MB),
+            per_file_concurrency=raw_data_save_options.get("per_file_concurrency", DEFAULT_PER_FILE_CONCURRENCY),
+            dedupe=bool(raw_data_save_options.get("dedupe", False)),
+            manifest=manifest,
+            session=minio_session,
+            compression=raw_data_save_options.get("compression", ""),
+            compression_level=raw_data_save_options.get("compression_level"),
+        )
         result["minio"] = minio_res
         result["ok"] = result["ok"] and bool(minio_res.get("ok", False))
         messages.append(minio_res.get("message", ""))
-        config["minio"] = get_config(files, minio_payload=minio_payload)
-
-    if not send_m and not save_l:
-        result["ok"] = True
-        result["message"] = "No raw-data save requested"
-        return result, config
+        uploads = {d["file"]: d for d in minio_res.get("details", []) or []}
+        config["minio"] = get_config(files, minio_payload=minio_payload, manifest=manifest, uploads=uploads)
 
     result["message"] = " | ".join(m for m in messages if m)
     return result, config
 
 
-def get_config(files, minio_payload=None, local_path=None):
+def build_raw_data_manifest(
+    files, chunk_mb=DEFAULT_MULTIPART_CHUNK_MB, workers=DEFAULT_UPLOAD_WORKERS, cache: ChecksumCache = None
+) -> Dict[str, Dict[str, Any]]:
+    """Manifest ({source_path: size/mtime/checksums}) of ``format_raw_data`` output.
+
+    ``cache`` is the caller's ``ChecksumCache``, saved by the caller;
+    without one a cache is loaded and saved for this call.
+    """
+    paths = [file['source_path'] for file in files.values()]
+    if cache is not None:
+        return build_manifest(paths, _part_bytes(chunk_mb), workers=workers, cache=cache)
+    cache = ChecksumCache()
+    manifest = build_manifest(paths, _part_bytes(chunk_mb), workers=workers, cache=cache)
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"Could not save checksum cache: {e}")
+    return manifest
+
+
+def get_config(files, minio_payload=None, local_path=None, manifest=None, uploads=None):
+    """Describe saved files for the run's ``raw_data`` config.
+
+    ``uploads`` maps source paths to ``save_files_to_minio`` details, so
+    compressed objects are listed under their stored name with their codec
+    and original size.
+    """
     config = {}
     for file in files.values():
+        entry = (manifest or {}).get(file['source_path'])
         file_config = {
             "type": file['new_name'].split(".")[-1],
             "fileName": file['new_name'],
-            "size": format_size(os.path.getsize(file['source_path'])),
+            "size": format_size(entry["size"] if entry is not None else os.path.getsize(file['source_path'])),
         }
+        if entry is not None:
+            file_config["sha256"] = entry["sha256"]
 
         if minio_payload:
             file_config["bucket"] = minio_payload.get("bucket", "")
             file_config["minio_folder"] = file['minio_folder']
+            upload = (uploads or {}).get(file['source_path'])
+            if upload and upload.get("codec"):
+                file_config["fileName"] = upload["key"].split("/")[-1]
+                file_config["compression"] = {
+                    "codec": upload["codec"],
+                    "originalFileName": file['new_name'],
+                    "originalSize": format_size(upload["bytes"]),
+                    "storedSize": format_size(upload["stored_bytes"]),
+                }
         
         else:
             file_config["local_path"] = local_path + "/" + file['minio_folder']
@@ -0,0 +1,51 @@
+import numpy as np
+
+from services.metrics_pyramid import PyramidBuilder, minmax_downsample
+
+
+def _stream(builder, steps, values, chunk):
+    for start in range(0, len(values), chunk):
+        builder.add(steps[start:start + chunk], values[start:start + chunk])
+    return {level: (s, v) for level, s, v in builder.build()}
+
+
+def test_streamed_levels_match_whole_series_bucket_counts():
+    rng = np.random.default_rng(0)
+    n = 500_000
+    steps = np.arange(n)
+    values = rng.standard_normal(n)
+    # 4 * 1_000 buckets: the buffer fills and is merged many times
+    levels = _stream(PyramidBuilder([100, 1_000]), steps, values, chunk=7_919)
+    for level in (100, 1_000):
+        streamed, _ = levels[level]
+        reference, _ = minmax_downsample(steps, values, level)
+        assert len(streamed) <= level
+        got = np.histogram(streamed, bins=10, range=(0, n))[0]
+        want = np.histogram(reference, bins=10, range=(0, n))[0]
+        # same spread over the series, up to rounding the width to whole buckets
+        assert np.all(np.abs(got - want) <= max(2, 0.05 * want.max())), (level, got, want)
+
+
+def test_streamed_levels_keep_extremes():
+    rng = np.random.default_rng(1)
+    n = 200_000
+    steps = np.arange(n)
+    values = rng.standard_normal(n)
+    values[[10, 150_000]] = [50.0, -50.0]
+    levels = _stream(PyramidBuilder([100]), steps, values, chunk=1_000)
+    s, v = levels[100]
+    assert 50.0 in v and -50.0 in v
+    assert np.all(np.diff(s) > 0)
+
+
+def test_unmerged_series_equals_minmax_downsample():
+    rng = np.random.default_rng(2)
+    n = 3_000
+    steps = np.arange(n) * 5
+    values = rng.standard_normal(n)
+    values[rng.random(n) < 0.05] = np.nan
+    levels = _stream(PyramidBuilder([10, 100, 1_000]), steps, values, chunk=333)
+    for level, (s, v) in levels.items():
+        rs, rv = minmax_downsample(steps, values, level)
+        assert np.array_equal(s, rs)
+        assert np.array_equal(v, rv, equal_nan=True)
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from services.prefs import Preferences
 from services.experiment_sender import send_experiment
+from services.payload import build_payload
 from pathlib import Path
 from ui.mongo_view import MongoSection
 from ui.minio_view import MinioSection
@@ -111,71 +112,11 @@ class AppView(ctk.CTk):
         # aggregate data
         data = self.prefs_dict()
         # Build structured payload with selectors grouped under experiment
-        payload = {
-            "mongo": {
-                "use_uri": data.get("use_uri", 0),
-                "uri": data.get("uri", ""),
-                "host": data.get("host", ""),
-                "port": data.get("port", ""),
-                "user": data.get("user", ""),
-                "db": data.get("db", ""),
-                "tls": data.get("tls", 0),
-                "password": self.mongo_section.get_password(),
-            },
-            "minio": {
-                "endpoint": data.get("minio_endpoint", ""),
-                "access_key": data.get("minio_access_key", ""),
-                "tls": data.get("minio_tls", 0),
-                "secret_key": self.minio_section.get_secret(),
-                "bucket": data.get("minio_bucket", ""),
-            },
-            "experiment": {
-                "folder": data.get("experiment_folder", ""),
-                "name": data.get("experiment_name", ""),
-                "folders": data.get("experiment_folders", []),
-                "selectors": {
-                    "config": {
-                        "name": data.get("config_name", ""),
-                        "sheet": data.get("config_sheet", ""),
-                        "options": {
-                            "flatten": data.get("config_flatten", 0),
-                            "sep": data.get("config_sep", ","),
-                        },
-                    },
-                    "metrics": {
-                        "name": data.get("metrics_name", ""),
-                        "sheet": data.get("metrics_sheet", ""),
-                        "options": {
-                            "header": data.get("metrics_header", 0),
-                            "has_time": data.get("metrics_has_time", 0),
-                            "time_col": data.get("metrics_time_col", ""),
-                            "selected_cols": data.get("metrics_selected_cols", []),
-                            "sep": data.get("metrics_sep", ","),
-                        },
-                    },
-                    "results": {
-                        "name": data.get("results_name", ""),
-                        "sheet": data.get("results_sheet", ""),
-                        "options": {
-                            "sep": data.get("results_sep", ","),
-                        },
-                    },
-                    "raw_data": {
-                        "name": data.get("raw_data_name", ""),
-                        "files": data.get("raw_data_files", []),
-                        "options": {
-                            "send_minio": data.get("raw_data_send_minio", 1),
-                            "save_locally": data.get("raw_data_save_locally", 0),
-                            "local_path": data.get("raw_data_local_path", ""),
-                        },
-                    },
-                    "artifacts": {
-                        "name": data.get("artifacts_name", ""),
-                        "files": data.get("artifacts_files", []),
-                    },
-                },
-            },
-        }
+        payload = build_payload(
+            data,
+            password=self.mongo_section.get_password(),
+            minio_secret=self.minio_section.get_secret(),
+        )
 
         # produce payload and call service (non-blocking)
         try:
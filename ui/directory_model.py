@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+POLL_SECONDS = 2.0
+MAX_WATCHED = 8
+
+# inotify(7)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+
+def scan_directory(path: str) -> dict[str, str]:
+    """{name: "dir" | "file" | "other"} for the entries of ``path``.
+
+    Uses the entry types returned by ``os.scandir``, so no ``stat`` call is
+    made per entry except for symlinks (which are resolved).
+    """
+    entries: dict[str, str] = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            entries[entry.name] = _entry_kind(entry)
+    return entries
+
+
+def _entry_kind(entry: os.DirEntry) -> str:
+    try:
+        if entry.is_dir():
+            return "dir"
+        if entry.is_file():
+            return "file"
+    except OSError:
+        pass
+    return "other"
+
+
+def _path_kind(path: str) -> str:
+    if os.path.isdir(path):
+        return "dir"
+    if os.path.isfile(path):
+        return "file"
+    return "other"
+
+
+class _Inotify:
+    """Minimal ctypes binding of Linux inotify; ``available`` is False elsewhere."""
+
+    def __init__(self):
+        self.fd = -1
+        self._libc = None
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd >= 0:
+            self.fd = fd
+            self._libc = libc
+
+    @property
+    def available(self) -> bool:
+        return self.fd >= 0
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Yield (wd, mask, name) for the pending events."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, name
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class DirectoryModel:
+    """Live, in-memory listings of a few directories, kept off the UI thread.
+
+    ``listing(path)`` returns the cached {name: kind} of ``path`` or None
+    while its first scan is still running; asking for a directory starts
+    watching it. A background thread scans with ``os.scandir`` and then
+    applies inotify events to the listing instead of rescanning. Network
+    shares do not report remote changes through inotify, so the directory
+    mtime is also checked every ``poll_seconds`` (one ``stat`` per
+    directory) and a changed directory is rescanned; without inotify this
+    polling is the only update mechanism. Only the ``max_watched`` most
+    recently requested directories are kept.
+
+    ``changed()`` returns the directories updated since the previous call;
+    the UI polls it from an ``after()`` loop.
+    """
+
+    def __init__(self, poll_seconds: float = POLL_SECONDS, max_watched: int = MAX_WATCHED):
+        self.poll_seconds = poll_seconds
+        self.max_watched = max_watched
+        self._lock = threading.Lock()
+        self._listings: "OrderedDict[str, dict[str, str] | None]" = OrderedDict()
+        self._changed: set[str] = set()
+        self._requests: "queue.Queue[tuple[str, str]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._inotify = _Inotify()
+        # wakes the worker: a pipe next to the inotify fd in select(), or an Event without inotify
+        self._wakeup = threading.Event()
+        self._wakeup_r, self._wakeup_w = os.pipe() if self._inotify.available else (-1, -1)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="directory-model")
+        self._thread.start()
+
+    # --- UI side ---
+    def listing(self, path) -> dict[str, str] | None:
+        key = os.path.abspath(str(path))
+        with self._lock:
+            if key in self._listings:
+                self._listings.move_to_end(key)
+                current = self._listings[key]
+                return dict(current) if current is not None else None
+            self._listings[key] = None
+            evicted = []
+            while len(self._listings) > self.max_watched:
+                evicted.append(self._listings.popitem(last=False)[0])
+        for old in evicted:
+            self._request("unwatch", old)
+        self._request("watch", key)
+        return None
+
+    def names(self, path, kind: str | None = None) -> list[str] | None:
+        """Sorted entry names of ``path`` (only ``kind`` entries if given), or None."""
+        entries = self.listing(path)
+        if entries is None:
+            return None
+        names = [n for n, k in entries.items() if kind is None or k == kind]
+        names.sort(key=lambda n: n.lower())
+        return names
+
+    def kind(self, path) -> str | None:
+        """Kind of ``path`` from its parent's listing; None if not (yet) known."""
+        path = os.path.abspath(str(path))
+        with self._lock:
+            entries = self._listings.get(os.path.dirname(path))
+            return entries.get(os.path.basename(path)) if entries is not None else None
+
+    def changed(self) -> set[str]:
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake()
+
+    # --- worker ---
+    def _request(self, action: str, path: str) -> None:
+        self._requests.put((action, path))
+        self._wake()
+
+    def _wake(self) -> None:
+        self._wakeup.set()
+        if self._wakeup_w >= 0:
+            try:
+                os.write(self._wakeup_w, b"x")
+            except OSError:
+                pass
+
+    def _wait(self, timeout: float) -> bool:
+        """Sleep until woken, an inotify event or ``timeout``; True if events are pending."""
+        if not self._inotify.available:
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            return False
+        ready, _, _ = select.select([self._wakeup_r, self._inotify.fd], [], [], timeout)
+        if self._wakeup_r in ready:
+            os.read(self._wakeup_r, 4096)
+        self._wakeup.clear()
+        return self._inotify.fd in ready
+
+    def _publish(self, path: str, entries: dict[str, str] | None) -> None:
+        with self._lock:
+            if path in self._listings:
+                self._listings[path] = entries
+                self._changed.add(path)
+
+    def _run(self) -> None:
+        watches: dict[int, str] = {}
+        wds: dict[str, int] = {}
+        mtimes: dict[str, int | None] = {}
+        listings: dict[str, dict[str, str] | None] = {}
+
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+
+        def rescan(path):
+            mtimes[path] = mtime(path)
+            try:
+                listings[path] = scan_directory(path)
+            except OSError:
+                listings[path] = {}
+            self._publish(path, dict(listings[path]))
+
+        next_poll = time.monotonic() + self.poll_seconds
+        try:
+            while not self._stop.is_set():
+                events_pending = self._wait(max(0.0, next_poll - time.monotonic()))
+                while True:
+                    try:
+                        action, path = self._requests.get_nowait()
+                    except queue.Empty:
+                        break
+                    if action == "watch":
+                        if self._inotify.available and path not in wds:
+                            try:
+                                wd = self._inotify.add_watch(path)
+                                watches[wd] = path
+                                wds[path] = wd
+                            except OSError:
+                                pass
+                        rescan(path)
+                    else:
+                        wd = wds.pop(path, None)
+                        if wd is not None:
+                            watches.pop(wd, None)
+                            self._inotify.rm_watch(wd)
+                        listings.pop(path, None)
+                        mtimes.pop(path, None)
+                if events_pending:
+                    dirty = set()
+                    for wd, mask, name in self._inotify.read_events():
+                        if mask & IN_Q_OVERFLOW:
+                            dirty.update(listings)
+                            continue
+                        path = watches.get(wd)
+                        if path is None or listings.get(path) is None:
+                            continue
+                        if mask & IN_IGNORED:
+                            watches.pop(wd, None)
+                            wds.pop(path, None)
+                            continue
+                        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                            dirty.add(path)
+                        elif mask & (IN_DELETE | IN_MOVED_FROM):
+                            listings[path].pop(name, None)
+                        elif mask & (IN_CREATE | IN_MOVED_TO) and name:
+                            full = os.path.join(path, name)
+                            listings[path][name] = "dir" if mask & IN_ISDIR else _path_kind(full)
+                        else:
+                            continue
+                        mtimes[path] = mtime(path)
+                        self._publish(path, dict(listings[path]))
+                    for path in dirty:
+                        rescan(path)
+                if time.monotonic() >= next_poll:
+                    next_poll = time.monotonic() + self.poll_seconds
+                    for path in list(listings):
+                        if mtime(path) != mtimes.get(path):
+                            rescan(path)
+        finally:
+            self._inotify.close()
+            if self._wakeup_r >= 0:
+                os.close(self._wakeup_r)
+                os.close(self._wakeup_w)
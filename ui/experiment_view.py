@@ -1,23 +1,37 @@
+import os
 import customtkinter as ctk
 from pathlib import Path
 from tkinter import filedialog
-from openpyxl import load_workbook
-import csv
+from ui.directory_model import DirectoryModel, scan_directory
+from ui.preview_loader import PreviewLoader, WorkbookMetaCache, read_sheet_names, read_tabular_preview
+from ui.reconcile import Block, reconcile_blocks
+from ui.virtual_list import VirtualCheckList
 # pandas optional: not required for current readers (openpyxl/csv used)
 pd = None
 
+# how often directory changes found by the background scanner are applied
+DIR_POLL_MS = 300
+
 
 class ExperimentSection(ctk.CTkFrame):
     def __init__(self, master, on_change=None, on_send=None):
         super().__init__(master, corner_radius=12)
         self.on_change = on_change
         self.on_send = on_send
-        self._selected_files: dict[str, set[str]] = {}
+        # file / column / folder selections: None until the user (or saved prefs)
+        # made a choice, meaning "everything"; an empty set means "nothing"
+        self._selected_files: dict[str, set[str] | None] = {}
+        # files listed at the last render, so files added later get selected
+        self._known_files: dict[str, set[str]] = {}
         self._metrics_settings: dict = {
             "header": True,
             "has_time": False,
             "time_col": "",
-            "selected_cols": set(),
+            "selected_cols": None,
+            "write_mode": "log_scalar",
+            "columnar_store": "gridfs",
+            "streaming": False,
+            "pyramid": False,
         }
         self._config_settings: dict = {
             "flatten": False,
@@ -26,6 +40,14 @@ class ExperimentSection(ctk.CTkFrame):
             "send_minio": True,
             "save_locally": False,
             "local_path": "",
+            "upload_workers": 4,
+            "dedupe": False,
+            "local_strategy": "auto",
+            "compression": "",
+        }
+        self._artifacts_settings: dict = {
+            "minio_threshold_mb": 0,
+            "content_addressed": False,
         }
         # CSV separators per selector (persisted)
         self._csv_separators: dict[str, str] = {
@@ -35,8 +57,27 @@ class ExperimentSection(ctk.CTkFrame):
         }
         # batch sending controls (not persisted)
         self._batch_enable = False
-        self._batch_selected: set[str] = set()
+        self._batch_selected: set[str] | None = None
+        self._batch_list = None
+        # number of worker processes used to send a batch (persisted)
+        self._send_workers = 1
+        # skip folders already sent by the previous batch (not restored)
+        self.resume_var = ctk.BooleanVar(value=False)
+        # only send folders whose files changed since their last send (persisted)
+        self.sync_var = ctk.BooleanVar(value=False)
+        # how Sacred's git/host/dependency info is collected (persisted)
+        self._send_environment = "batch"
         self._allowed_tabular_suffixes = (".json", ".csv", ".xlsx", ".xlsm")
+        # folder listings are scanned and kept up to date in the background
+        self._dir_model = DirectoryModel()
+        # file previews (sheet names, metrics header) are read in the background
+        self._previews = PreviewLoader(self)
+        # sheet names / headers / row estimates, persisted across restarts
+        self._workbook_meta = WorkbookMetaCache()
+        self._metrics_preview: tuple[tuple, object] | None = None
+        self._metrics_rows_estimate: int | None = None
+        # detail cards kept between renders: {key: {"frame", "blocks"}}
+        self._cards: dict[str, dict] = {}
         self.grid_columnconfigure(0, weight=0)
         self.grid_columnconfigure(1, weight=1)
         self.grid_columnconfigure(2, weight=0)
@@ -106,13 +147,34 @@ class ExperimentSection(ctk.CTkFrame):
             pass
         self.batch_container.grid_columnconfigure(0, weight=1)
         self._render_batch_checkboxes()
+        self.after(DIR_POLL_MS, self._poll_directory_changes)
 
         # actions row: Send experiment button inside the section, below batch
         actions_row = ctk.CTkFrame(self, fg_color="transparent")
         actions_row.grid(row=batch_row + 2, column=0, columnspan=3, sticky="ew", padx=6, pady=(0, 2))
-        actions_row.grid_columnconfigure(2, weight=1)
+        actions_row.grid_columnconfigure(4, weight=1)
+        ctk.CTkLabel(actions_row, text="Parallel sends").grid(row=0, column=0, sticky="w", padx=(6, 6), pady=(2, 2))
+        self.workers_menu = ctk.CTkOptionMenu(
+            actions_row, values=["1", "2", "4", "8", "16"], width=70, dynamic_resizing=False,
+            command=self._on_workers_changed
+        )
+        self.workers_menu.set(str(self._send_workers))
+        self.workers_menu.grid(row=0, column=1, sticky="w", pady=(2, 2))
+        ctk.CTkCheckBox(actions_row, text="Resume last batch", variable=self.resume_var).grid(
+            row=0, column=2, sticky="w", padx=(12, 6), pady=(2, 2)
+        )
+        ctk.CTkCheckBox(actions_row, text="Only changed folders", variable=self.sync_var).grid(
+            row=0, column=3, sticky="w", padx=(6, 6), pady=(2, 2)
+        )
         send_btn = ctk.CTkButton(actions_row, text="Send experiment", width=180, height=36, command=self._on_send_click)
-        send_btn.grid(row=0, column=2, sticky="e", padx=(0, 6), pady=(2, 2))
+        send_btn.grid(row=0, column=4, sticky="e", padx=(0, 6), pady=(2, 2))
+        ctk.CTkLabel(actions_row, text="Environment").grid(row=1, column=0, sticky="w", padx=(6, 6), pady=(2, 2))
+        self.environment_menu = ctk.CTkOptionMenu(
+            actions_row, values=["batch", "per_run", "none"], width=100, dynamic_resizing=False,
+            command=self._on_environment_changed
+        )
+        self.environment_menu.set(self._send_environment)
+        self.environment_menu.grid(row=1, column=1, columnspan=2, sticky="w", pady=(2, 2))
 
         # status labels: one for file/cards errors, one for send result
         self.status = ctk.CTkLabel(self, text="", wraplength=520, justify="left")
@@ -120,7 +182,39 @@ class ExperimentSection(ctk.CTkFrame):
         self.send_status = ctk.CTkLabel(self, text="", wraplength=520, justify="left")
         self.send_status.grid(row=batch_row + 4, column=0, columnspan=3, sticky="ew", padx=12, pady=(2, 4))
 
+    def _on_workers_changed(self, value: str):
+        try:
+            self._send_workers = max(1, int(value))
+        except ValueError:
+            self._send_workers = 1
+        if callable(self.on_change):
+            self.on_change()
+
+    def _on_environment_changed(self, value: str):
+        self._send_environment = value or "batch"
+        if callable(self.on_change):
+            self.on_change()
+
+    def _empty_selection_message(self) -> str:
+        """Why Send must be refused: a list explicitly emptied with "None"; "" if fine."""
+        if self._batch_enable and self._batch_selected is not None and not self._batch_selected:
+            return "No experiment folder selected for the batch."
+        labels = dict(self._keys)
+        for key in ("raw_data", "artifacts"):
+            path = self.get_full_path_for_key(key)
+            selected = self._selected_files.get(key)
+            if path and selected is not None and not selected and self._path_kind(path) == "dir":
+                return f"No {labels[key].lower()} files selected: select at least one or set {labels[key]} to None."
+        cols = self._metrics_settings.get("selected_cols")
+        if self.get_full_path_for_key("metrics") and cols is not None and not (cols - {self._metrics_settings.get("time_col") or None}):
+            return "No metric columns selected: select at least one or set Metrics to None."
+        return ""
+
     def _on_send_click(self):
+        message = self._empty_selection_message()
+        if message:
+            self.send_status.configure(text=f"❌ {message}")
+            return
         try:
             if callable(self.on_send):
                 self.on_send()
@@ -128,29 +222,49 @@ class ExperimentSection(ctk.CTkFrame):
             pass
 
     # --- IO ---
+    def destroy(self):
+        self._dir_model.close()
+        super().destroy()
+
     def get_prefs(self) -> dict:
         data = {"experiment_folder": self.folder_entry.get().strip()}
         for key, _ in self._keys:
             data[f"{key}_name"] = (self.file_menus[key].get() or "").strip()
             data[f"{key}_sheet"] = (self.sheet_menus[key].get() or "").strip()
             if key in ("raw_data", "artifacts"):
-                selected = sorted(list(self._selected_files.get(key, set())))
-                data[f"{key}_files"] = selected
+                selected = self._selected_files.get(key)
+                data[f"{key}_files"] = sorted(selected) if selected is not None else None
         # metrics settings persistence
         data["metrics_header"] = int(bool(self._metrics_settings.get("header", True)))
         data["metrics_has_time"] = int(bool(self._metrics_settings.get("has_time", False)))
         data["metrics_time_col"] = self._metrics_settings.get("time_col", "")
-        data["metrics_selected_cols"] = sorted(list(self._metrics_settings.get("selected_cols", set())))
+        selected_cols = self._metrics_settings.get("selected_cols")
+        data["metrics_selected_cols"] = sorted(selected_cols) if selected_cols is not None else None
+        data["metrics_write_mode"] = self._metrics_settings.get("write_mode", "log_scalar")
+        data["metrics_columnar_store"] = self._metrics_settings.get("columnar_store", "gridfs")
+        data["metrics_streaming"] = int(bool(self._metrics_settings.get("streaming", False)))
+        data["metrics_pyramid"] = int(bool(self._metrics_settings.get("pyramid", False)))
         # config settings persistence
         data["config_flatten"] = int(bool(self._config_settings.get("flatten", False)))
         # raw_data settings persistence
         data["raw_data_send_minio"] = int(bool(self._raw_data_settings.get("send_minio", True)))
         data["raw_data_save_locally"] = int(bool(self._raw_data_settings.get("save_locally", False)))
         data["raw_data_local_path"] = self._raw_data_settings.get("local_path", "")
+        data["raw_data_upload_workers"] = int(self._raw_data_settings.get("upload_workers", 4))
+        data["raw_data_dedupe"] = int(bool(self._raw_data_settings.get("dedupe", False)))
+        data["raw_data_local_strategy"] = self._raw_data_settings.get("local_strategy", "auto")
+        data["raw_data_compression"] = self._raw_data_settings.get("compression", "")
+        # artifacts settings persistence
+        data["artifacts_minio_threshold_mb"] = self._artifacts_settings.get("minio_threshold_mb", 0)
+        data["artifacts_content_addressed"] = int(bool(self._artifacts_settings.get("content_addressed", False)))
         # CSV separators
         data["config_sep"] = self._csv_separators.get("config", ",")
         data["metrics_sep"] = self._csv_separators.get("metrics", ",")
         data["results_sep"] = self._csv_separators.get("results", ",")
+        data["send_workers"] = int(self._send_workers)
+        data["send_resume"] = int(bool(self.resume_var.get()))
+        data["send_sync"] = int(bool(self.sync_var.get()))
+        data["send_environment"] = self._send_environment
         # compute list of folders per batch toggle
         folders_list: list[str] = []
         base_folder = (self.folder_entry.get() or "").strip()
@@ -162,14 +276,10 @@ class ExperimentSection(ctk.CTkFrame):
                     parent = p.parent if p.exists() else None
                     if parent and parent.exists():
                         # if no selection yet, default to all siblings
-                        if not self._batch_selected:
-                            try:
-                                for d in parent.iterdir():
-                                    if d.is_dir() and not d.name.startswith("."):
-                                        self._batch_selected.add(d.name)
-                            except Exception:
-                                pass
-                        for name in sorted(list(self._batch_selected)):
+                        selected = self._batch_selected
+                        if selected is None:
+                            selected = set(self._sibling_folders(parent, wait=True))
+                        for name in sorted(selected):
                             folders_list.append(str((parent / name).resolve()))
             else:
                 if base_folder:
@@ -206,24 +316,50 @@ class ExperimentSection(ctk.CTkFrame):
         # restore per-folder file selections
         for key in ("raw_data", "artifacts"):
             saved = data.get(f"{key}_files", [])
-            if isinstance(saved, list):
-                self._selected_files[key] = set(saved)
+            self._selected_files[key] = set(saved) if isinstance(saved, list) else None
+            self._known_files.pop(key, None)
         # restore metrics settings
         self._metrics_settings["header"] = bool(data.get("metrics_header", 1))
         self._metrics_settings["has_time"] = bool(data.get("metrics_has_time", 0))
         self._metrics_settings["time_col"] = data.get("metrics_time_col", "") or ""
-        sel = data.get("metrics_selected_cols", [])
-        self._metrics_settings["selected_cols"] = set(sel) if isinstance(sel, list) else set()
+        sel = data.get("metrics_selected_cols")
+        self._metrics_settings["selected_cols"] = set(sel) if isinstance(sel, list) else None
+        self._metrics_settings["write_mode"] = data.get("metrics_write_mode", "log_scalar") or "log_scalar"
+        self._metrics_settings["columnar_store"] = data.get("metrics_columnar_store", "gridfs") or "gridfs"
+        self._metrics_settings["streaming"] = bool(data.get("metrics_streaming", 0))
+        self._metrics_settings["pyramid"] = bool(data.get("metrics_pyramid", 0))
         # restore config settings
         self._config_settings["flatten"] = bool(data.get("config_flatten", 0))
         # restore raw_data settings
         self._raw_data_settings["send_minio"] = bool(data.get("raw_data_send_minio", 1))
         self._raw_data_settings["save_locally"] = bool(data.get("raw_data_save_locally", 0))
         self._raw_data_settings["local_path"] = data.get("raw_data_local_path", "") or ""
+        try:
+            self._raw_data_settings["upload_workers"] = max(1, int(data.get("raw_data_upload_workers", 4)))
+        except (TypeError, ValueError):
+            self._raw_data_settings["upload_workers"] = 4
+        self._raw_data_settings["dedupe"] = bool(data.get("raw_data_dedupe", 0))
+        self._raw_data_settings["local_strategy"] = data.get("raw_data_local_strategy", "auto") or "auto"
+        self._raw_data_settings["compression"] = data.get("raw_data_compression", "") or ""
+        # restore artifacts settings
+        try:
+            self._artifacts_settings["minio_threshold_mb"] = max(0.0, float(data.get("artifacts_minio_threshold_mb", 0) or 0))
+        except (TypeError, ValueError):
+            self._artifacts_settings["minio_threshold_mb"] = 0
+        self._artifacts_settings["content_addressed"] = bool(data.get("artifacts_content_addressed", 0))
         # restore CSV separators
         self._csv_separators["config"] = data.get("config_sep", ",") or ","
         self._csv_separators["metrics"] = data.get("metrics_sep", ",") or ","
         self._csv_separators["results"] = data.get("results_sep", ",") or ","
+        # restore batch workers
+        try:
+            self._send_workers = max(1, int(data.get("send_workers", 1) or 1))
+        except (TypeError, ValueError):
+            self._send_workers = 1
+        self.workers_menu.set(str(self._send_workers))
+        self.sync_var.set(bool(data.get("send_sync", 0)))
+        self._send_environment = data.get("send_environment", "batch") or "batch"
+        self.environment_menu.set(self._send_environment)
         # restore experiment name
         # self.exp_name_entry.delete(0, "end")
         # self.exp_name_entry.insert(0, data.get("experiment_name", ""))
@@ -231,12 +367,6 @@ class ExperimentSection(ctk.CTkFrame):
         self.render_details_sections()
 
     def _render_batch_checkboxes(self):
-        # clear
-        for child in list(self.batch_container.winfo_children() if hasattr(self, 'batch_container') else []):
-            try:
-                child.destroy()
-            except Exception:
-                pass
         if not getattr(self, 'batch_container', None):
             return
         # Hide the container when disabled; show when enabled
@@ -259,28 +389,31 @@ class ExperimentSection(ctk.CTkFrame):
                 p = Path(base_folder)
                 parent = p.parent if p.exists() else None
                 if parent and parent.exists():
-                    siblings = [d.name for d in parent.iterdir() if d.is_dir() and not d.name.startswith('.')]
-                    siblings.sort(key=lambda n: n.lower())
+                    # None while the parent's first scan is running; shown once it completes
+                    siblings = self._sibling_folders(parent)
         except Exception:
-            siblings = []
-        # default select all if nothing yet
-        if not self._batch_selected:
+            siblings = None
+        # default select all if nothing chosen yet (and the siblings are known)
+        if self._batch_selected is None and siblings is not None:
             self._batch_selected = set(siblings)
-        # render
-        for i, name in enumerate(siblings):
-            var = ctk.BooleanVar(value=(name in self._batch_selected))
-            def _toggle(n=name, v=var):
-                if v.get():
-                    self._batch_selected.add(n)
-                else:
-                    try:
-                        self._batch_selected.remove(n)
-                    except KeyError:
-                        pass
-                if callable(self.on_change):
-                    self.on_change()
-            cb = ctk.CTkCheckBox(self.batch_container, text=name, variable=var, command=_toggle)
-            cb.grid(row=i, column=0, sticky="w", padx=8, pady=2)
+        siblings = siblings or []
+        if self._batch_list is None:
+            self._batch_list = VirtualCheckList(self.batch_container, on_change=self._notify_change, rows=12)
+            self._batch_list.grid(row=0, column=0, sticky="nsew", padx=2, pady=2)
+        self._batch_list.set_items(siblings, self._batch_selected if self._batch_selected is not None else set())
+
+    def _sibling_folders(self, parent: Path, wait: bool = False) -> list[str] | None:
+        """Non-hidden folders next to the experiment folder.
+
+        None while the background scan of ``parent`` is running, unless
+        ``wait`` is set, in which case the folder is scanned directly.
+        """
+        names = self._dir_model.names(parent, "dir")
+        if names is None and wait:
+            names = sorted((n for n, k in scan_directory(str(parent)).items() if k == "dir"), key=lambda n: n.lower())
+        if names is None:
+            return None
+        return [n for n in names if not n.startswith('.')]
 
     # --- Events ---
     def choose_folder(self):
@@ -297,13 +430,17 @@ class ExperimentSection(ctk.CTkFrame):
         try:
             if key == "metrics":
                 # clear selected columns and time column; will be recomputed on render
-                self._metrics_settings["selected_cols"] = set()
+                self._metrics_settings["selected_cols"] = None
                 self._metrics_settings["time_col"] = ""
             elif key in ("raw_data", "artifacts"):
                 # clear previously selected files so defaults (all files) apply
-                self._selected_files[key] = set()
+                self._selected_files[key] = None
+                self._known_files.pop(key, None)
         except Exception:
             pass
+        # drop previews still loading for the previous selection
+        self._previews.cancel(("sheets", key))
+        self._previews.cancel(("columns", key))
         self.update_sheet_menu_for(key)
         self.render_details_sections()
         if callable(self.on_change):
@@ -327,22 +464,48 @@ class ExperimentSection(ctk.CTkFrame):
         path = self.get_full_path_for_key(key)
         # hide if not supported tabular file
         # special-case: for raw_data and artifacts never show sheet selector
-        if not path or path.is_dir() or key in ("raw_data", "artifacts") or path.suffix.lower() not in (".xlsx", ".xlsm"):
+        if not path or self._path_kind(path) == "dir" or key in ("raw_data", "artifacts") or path.suffix.lower() not in (".xlsx", ".xlsm"):
             try:
                 sheet_menu.grid_remove()
             except Exception:
                 pass
+            self._previews.cancel(("sheets", key))
             sheet_menu.configure(values=[""])
             sheet_menu.set("")
             return
-        # fetch sheet names
-        sheets: list[str] = []
         try:
-            wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-            sheets = list(wb.sheetnames)
-            wb.close()
-        except Exception as e:
-            self.status.configure(text=f"Could not read sheets from {path.name}: {e}")
+            st = path.stat()
+            signature = (str(path), st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = (str(path), None, None)
+        cached = self._workbook_meta.sheets(path)
+        if cached is not None:
+            self._apply_sheet_names(key, cached)
+            return
+        # keep the current (e.g. restored) sheet visible while the names load
+        current = sheet_menu.get() or ""
+        try:
+            sheet_menu.configure(values=[current])
+            sheet_menu.grid()
+        except Exception:
+            pass
+
+        def on_done(result, key=key, path=path, signature=signature):
+            if isinstance(result, Exception):
+                self.status.configure(text=f"Could not read sheets from {path.name}: {result}")
+                result = []
+            else:
+                self._workbook_meta.put_sheets(path, result, read_stamp=(signature[2], signature[1]))
+                self._workbook_meta.save()
+            self._apply_sheet_names(key, result)
+            self.render_details_sections()
+            if callable(self.on_change):
+                self.on_change()
+
+        self._previews.request(("sheets", key), signature, lambda cancel: read_sheet_names(path, cancel), on_done)
+
+    def _apply_sheet_names(self, key: str, sheets: list[str]):
+        sheet_menu = self.sheet_menus[key]
         if not sheets:
             sheets = [""]
         try:
@@ -362,17 +525,18 @@ class ExperimentSection(ctk.CTkFrame):
 
     def refresh_items(self, preserve_selection: bool = True):
         base_folder = self.folder_entry.get().strip()
-        all_items = self._list_items()
+        entries = self._list_entries()
+        if entries is None:
+            # first scan of the folder still running: menus are filled when it completes
+            self.render_details_sections()
+            return
+        all_items = sorted(entries, key=lambda n: n.lower())
         restricted = {"config", "metrics", "results"}
         for key, _ in self._keys:
             current = (self.file_menus[key].get() or "") if preserve_selection else ""
             # Build values list per key
             if key in restricted and base_folder:
-                try:
-                    base = Path(base_folder)
-                    filtered = [n for n in all_items if (base / n).is_file() and (base / n).suffix.lower() in self._allowed_tabular_suffixes]
-                except Exception:
-                    filtered = []
+                filtered = [n for n in all_items if entries[n] == "file" and Path(n).suffix.lower() in self._allowed_tabular_suffixes]
                 # For config, remove the "None" option entirely
                 values = (filtered if key == "config" else ["None"] + filtered)
             else:
@@ -397,292 +561,436 @@ class ExperimentSection(ctk.CTkFrame):
         # refresh details after items update
         self.render_details_sections()
 
-    def _list_items(self) -> list[str]:
+    def _list_entries(self) -> dict[str, str] | None:
+        """{name: kind} of the experiment folder, None until its first scan completes."""
         base_folder = self.folder_entry.get().strip()
         if not base_folder:
-            return []
-        try:
-            base = Path(base_folder)
-            if not base.exists() or not base.is_dir():
-                return []
-            names = [p.name for p in base.iterdir()]
-            names.sort(key=lambda n: n.lower())
-            return names
-        except Exception:
-            return []
+            return {}
+        return self._dir_model.listing(base_folder)
+
+    def _path_kind(self, path: Path) -> str | None:
+        """"dir", "file" or "other" from the folder listing, falling back to a stat."""
+        kind = self._dir_model.kind(path)
+        if kind is None:
+            kind = "dir" if path.is_dir() else ("file" if path.is_file() else None)
+        return kind
+
+    def _poll_directory_changes(self):
+        changed = self._dir_model.changed()
+        if changed:
+            base_folder = self.folder_entry.get().strip()
+            base = os.path.abspath(base_folder) if base_folder else None
+            if base in changed:
+                self.refresh_items(preserve_selection=True)
+            else:
+                # raw_data / artifacts folder lists
+                self.render_details_sections()
+            if base and os.path.dirname(base) in changed and self._batch_enable:
+                self._render_batch_checkboxes()
+        self.after(DIR_POLL_MS, self._poll_directory_changes)
 
     # --- Dynamic details per selector ---
     def render_details_sections(self):
+        """Update the detail cards in place.
+
+        Each card is a list of keyed blocks (see ``ui.reconcile``); only the
+        blocks whose state changed since the last render are rebuilt; file
+        and column lists keep their widget and only receive the new items.
+        """
         # clear any previous error message on each cards update
         try:
             self.status.configure(text="")
         except Exception:
             pass
-        # clear previous
-        for child in list(self.details_container.winfo_children()):
-            try:
-                child.destroy()
-            except Exception:
-                pass
         cols = 2
         idx = 0
+        visible = set()
         for key, label in self._keys:
             name = (self.file_menus[key].get() or "").strip()
             if not name or name == "None":
                 continue
+            visible.add(key)
             path = self.get_full_path_for_key(key)
-            # create a simple frame per selection in a two-column grid
+            # one persistent frame per selection in a two-column grid
             r, c = divmod(idx, cols)
-            sec = ctk.CTkFrame(self.details_container, corner_radius=12)
-            sec.grid(row=r, column=c, sticky="nsew", padx=6, pady=6)
-            sec.grid_columnconfigure(1, weight=1)
-            ctk.CTkLabel(sec, text=f"{label}", font=("Segoe UI", 14, "bold")).grid(
+            card = self._cards.get(key)
+            if card is None:
+                sec = ctk.CTkFrame(self.details_container, corner_radius=12)
+                sec.grid_columnconfigure(0, weight=1)
+                card = self._cards[key] = {"frame": sec, "blocks": {}}
+            card["frame"].grid(row=r, column=c, sticky="nsew", padx=6, pady=6)
+            reconcile_blocks(card["frame"], self._card_blocks(key, label, name, path), card["blocks"])
+            idx += 1
+        for key in [k for k in self._cards if k not in visible]:
+            try:
+                self._cards.pop(key)["frame"].destroy()
+            except Exception:
+                pass
+
+    def _card_blocks(self, key: str, label: str, name: str, path: Path | None) -> list[Block]:
+        blocks: list[Block] = []
+        kind = self._path_kind(path) if path else None
+
+        def build_title(f):
+            ctk.CTkLabel(f, text=f"{label}", font=("Segoe UI", 14, "bold")).grid(
                 row=0, column=0, columnspan=2, sticky="w", padx=8, pady=(8, 4)
             )
-            ctk.CTkLabel(sec, text="Selected file").grid(row=1, column=0, sticky="w", padx=8, pady=4)
-            ctk.CTkLabel(sec, text=name).grid(row=1, column=1, sticky="w", padx=(6, 8), pady=4)
-            # sheet (if visible)
-            sheet = (self.sheet_menus[key].get() or "").strip()
-            if sheet and not (key in ("raw_data", "artifacts")):
-                ctk.CTkLabel(sec, text="Sheet").grid(row=2, column=0, sticky="w", padx=8, pady=4)
-                ctk.CTkLabel(sec, text=sheet).grid(row=2, column=1, sticky="w", padx=(6, 8), pady=4)
-            # CSV separator selector for config/metrics/results
-            if path and path.is_file() and path.suffix.lower() == ".csv" and key in ("config", "metrics", "results"):
-                sep_row = 3 if (sheet and not (key in ("raw_data", "artifacts"))) else 2
-                ctk.CTkLabel(sec, text="Separator").grid(row=sep_row, column=0, sticky="w", padx=8, pady=4)
+        blocks.append(Block("title", label, build_title))
+
+        def build_file(f):
+            ctk.CTkLabel(f, text="Selected file").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+            ctk.CTkLabel(f, text=name).grid(row=0, column=1, sticky="w", padx=(6, 8), pady=4)
+        blocks.append(Block("file", name, build_file))
+        # sheet (if visible)
+        sheet = (self.sheet_menus[key].get() or "").strip()
+        if sheet and not (key in ("raw_data", "artifacts")):
+            def build_sheet(f):
+                ctk.CTkLabel(f, text="Sheet").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+                ctk.CTkLabel(f, text=sheet).grid(row=0, column=1, sticky="w", padx=(6, 8), pady=4)
+            blocks.append(Block("sheet", sheet, build_sheet))
+        # CSV separator selector for config/metrics/results
+        if kind == "file" and path.suffix.lower() == ".csv" and key in ("config", "metrics", "results"):
+            current_sep = self._csv_separators.get(key, ",")
+            def build_sep(f):
+                ctk.CTkLabel(f, text="Separator").grid(row=0, column=0, sticky="w", padx=8, pady=4)
                 sep_menu = ctk.CTkOptionMenu(
-                    sec,
+                    f,
                     values=[",", ";", "|", "\\t"],
                     dynamic_resizing=False,
                     command=lambda v, k=key: self._on_sep_changed(k, v)
                 )
-                current_sep = self._csv_separators.get(key, ",")
                 display_val = "\\t" if current_sep == "\t" else current_sep
                 sep_menu.set(display_val)
-                sep_menu.grid(row=sep_row, column=1, sticky="ew", padx=(6, 8), pady=4)
-            # folder checklist for raw_data / artifacts
-            if key in ("raw_data", "artifacts") and path and path.is_dir():
-                files = []
-                try:
-                    files = [p.name for p in Path(path).iterdir() if p.is_file()]
-                    files.sort(key=lambda n: n.lower())
-                except Exception:
-                    files = []
-                # initialize default selection: previously saved intersected with current files; new files selected by default
-                saved = self._selected_files.get(key, set())
-                if saved:
-                    selected = set(f for f in files if f in saved)
-                    # select also new files by default
-                    for f in files:
-                        if f not in saved:
-                            selected.add(f)
-                else:
+                sep_menu.grid(row=0, column=1, sticky="ew", padx=(6, 8), pady=4)
+            blocks.append(Block("sep", current_sep, build_sep))
+        # folder checklist for raw_data / artifacts
+        if key in ("raw_data", "artifacts") and kind == "dir":
+            files = self._dir_model.names(path, "file")
+            if files is None:
+                # first scan of the folder still running; keep the saved selection until it completes
+                def build_scanning(f):
+                    ctk.CTkLabel(f, text="Listing files…").grid(row=0, column=0, columnspan=2, sticky="w", padx=8, pady=(6, 4))
+                blocks.append(Block("files_loading", None, build_scanning))
+            else:
+                # default selection: all files; an explicit selection keeps its files
+                # still present, plus files that appeared since the last render
+                saved = self._selected_files.get(key)
+                known = self._known_files.get(key)
+                if saved is None:
                     selected = set(files)
+                else:
+                    selected = {f for f in files if f in saved or (known is not None and f not in known)}
                 self._selected_files[key] = selected
-                # render checkboxes
-                chk_container = ctk.CTkFrame(sec, corner_radius=8)
-                chk_container.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=6, pady=(4, 6))
-                # arrange in two columns if many files
-                for i in range(2):
-                    chk_container.grid_columnconfigure(i, weight=1)
-                for i, fname in enumerate(files):
-                    col = i % 2
-                    rowc = i // 2
-                    var = ctk.BooleanVar(value=fname in selected)
-                    def _make_cmd(k=key, name=fname, v=var):
-                        return lambda: self._on_file_toggle(k, name, v.get())
-                    cb = ctk.CTkCheckBox(chk_container, text=fname, variable=var, command=_make_cmd())
-                    cb.grid(row=rowc, column=col, sticky="w", padx=6, pady=2)
-            # raw_data controls: Send Minio / Save locally + path
-            if key == "raw_data":
-                has_checklist = bool(path and path.is_dir())
-                next_row_local = 4 if has_checklist else 2
-                # Send Minio checkbox
-                send_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("send_minio", True)))
-                def on_send_toggle():
-                    self._raw_data_settings["send_minio"] = bool(send_var.get())
-                    if callable(self.on_change):
-                        self.on_change()
-                send_cb = ctk.CTkCheckBox(sec, text="Send Minio", variable=send_var, command=on_send_toggle)
-                send_cb.grid(row=next_row_local, column=0, sticky="w", padx=8, pady=(6, 4))
-                # Save locally checkbox
-                save_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("save_locally", False)))
-                def on_save_toggle():
-                    self._raw_data_settings["save_locally"] = bool(save_var.get())
-                    try:
-                        entry.configure(state=("normal" if save_var.get() else "disabled"))
-                        btn.configure(state=("normal" if save_var.get() else "disabled"))
-                    except Exception:
-                        pass
-                    if callable(self.on_change):
-                        self.on_change()
-                save_cb = ctk.CTkCheckBox(sec, text="Save locally", variable=save_var, command=on_save_toggle)
-                save_cb.grid(row=next_row_local, column=1, sticky="w", padx=8, pady=(6, 4))
-                # Path selector
-                def choose_path():
-                    folder = filedialog.askdirectory()
-                    if folder:
-                        try:
-                            entry.delete(0, "end")
-                            entry.insert(0, folder)
-                        except Exception:
-                            pass
-                        self._raw_data_settings["local_path"] = folder
-                        if callable(self.on_change):
-                            self.on_change()
-                ctk.CTkLabel(sec, text="Local path").grid(row=next_row_local + 1, column=0, sticky="w", padx=8, pady=4)
-                entry = ctk.CTkEntry(sec, placeholder_text="Select a folder…")
-                entry.grid(row=next_row_local + 1, column=1, sticky="ew", padx=(6, 8), pady=4)
-                if self._raw_data_settings.get("local_path"):
-                    try:
-                        entry.delete(0, "end")
-                        entry.insert(0, self._raw_data_settings.get("local_path", ""))
-                    except Exception:
-                        pass
-                btn = ctk.CTkButton(sec, text="Browse…", width=90, command=choose_path)
-                btn.grid(row=next_row_local + 2, column=1, sticky="e", padx=(6, 8), pady=(0, 6))
-                try:
-                    entry.configure(state=("normal" if save_var.get() else "disabled"))
-                    btn.configure(state=("normal" if save_var.get() else "disabled"))
-                except Exception:
-                    pass
-            # config controls
-            # show Flatten checkbox if config file is a JSON
-            if key == "config" and path and path.is_file() and path.suffix.lower() == ".json":
-                # decide next available row: 3 if sheet displayed, else 2
-                next_row_local = 3 if (self.sheet_menus[key].get().strip() and not (key in ("raw_data", "artifacts"))) else 2
+                self._known_files[key] = set(files)
+                blocks.append(self._checklist_block("files", files, selected))
+        # raw_data controls: Send Minio / Save locally + path
+        if key == "raw_data":
+            blocks.append(Block("raw_data_options", tuple(sorted(self._raw_data_settings.items())), self._build_raw_data_options))
+        # artifacts controls: files above a size go to MinIO with a pointer in the run
+        if key == "artifacts":
+            blocks.append(Block("artifacts_options", tuple(sorted(self._artifacts_settings.items())), self._build_artifacts_options))
+        # config controls
+        # show Flatten checkbox if config file is a JSON
+        if key == "config" and kind == "file" and path.suffix.lower() == ".json":
+            def build_flatten(f):
                 flatten_var = ctk.BooleanVar(value=bool(self._config_settings.get("flatten", False)))
                 def on_flatten_toggle():
                     self._config_settings["flatten"] = bool(flatten_var.get())
                     if callable(self.on_change):
                         self.on_change()
-                flatten_cb = ctk.CTkCheckBox(sec, text="Flatten", variable=flatten_var, command=on_flatten_toggle)
-                flatten_cb.grid(row=next_row_local, column=0, sticky="w", padx=8, pady=4)
-            # metrics DataFrame controls
-            if key == "metrics" and path and path.is_file():
-                col_names, data_rows = self._read_tabular(path, sheet)
-                # defaults for selected columns: if none saved, select all except time col
-                if not self._metrics_settings.get("selected_cols"):
-                    self._metrics_settings["selected_cols"] = set(col_names)
-                # Header checkbox
-                header_var = ctk.BooleanVar(value=bool(self._metrics_settings.get("header", True)))
-                def on_header_toggle():
-                    self._metrics_settings["header"] = bool(header_var.get())
-                    # reset selected cols to match new headers
-                    cols2, _ = self._read_tabular(path, sheet)
-                    self._metrics_settings["selected_cols"] = set(cols2)
-                    # if time col no longer exists, reset
-                    if self._metrics_settings.get("time_col") not in cols2:
-                        self._metrics_settings["time_col"] = ""
-                    self.render_details_sections()
-                    if callable(self.on_change):
-                        self.on_change()
-                header_cb = ctk.CTkCheckBox(sec, text="Column header", variable=header_var, command=on_header_toggle)
-                header_cb.grid(row=3, column=0, sticky="w", padx=8, pady=(6, 4))
-
-                # Time column checkbox
-                has_time_var = ctk.BooleanVar(value=bool(self._metrics_settings.get("has_time", False)))
-                def on_has_time_toggle():
-                    self._metrics_settings["has_time"] = bool(has_time_var.get())
-                    if not has_time_var.get():
-                        self._metrics_settings["time_col"] = ""
-                    self.render_details_sections()
-                    if callable(self.on_change):
-                        self.on_change()
-                time_cb = ctk.CTkCheckBox(sec, text="x-axis column", variable=has_time_var, command=on_has_time_toggle)
-                time_cb.grid(row=3, column=1, sticky="w", padx=8, pady=(6, 4))
-
-                next_row = 4
-                current_cols = list(col_names)
-                # Time column selector if enabled
-                if has_time_var.get():
-                    time_values = current_cols
-                    time_menu = ctk.CTkOptionMenu(sec, values=time_values, dynamic_resizing=False,
-                                                  command=lambda v: self._on_metrics_time_column_changed(v))
-                    # set current
-                    if self._metrics_settings.get("time_col") in time_values:
-                        time_menu.set(self._metrics_settings.get("time_col"))
-                    elif time_values:
-                        time_menu.set(time_values[0])
-                        self._metrics_settings["time_col"] = time_values[0]
-                    ctk.CTkLabel(sec, text="x-axis column").grid(row=next_row, column=0, sticky="w", padx=8, pady=4)
-                    time_menu.grid(row=next_row, column=1, sticky="ew", padx=(6, 8), pady=4)
-                    next_row += 1
-
-                # Columns checklist (exclude time column if set)
-                cols_to_list = [c for c in current_cols if c != self._metrics_settings.get("time_col", "")]
-                chk_container = ctk.CTkFrame(sec, corner_radius=8)
-                chk_container.grid(row=next_row, column=0, columnspan=2, sticky="nsew", padx=6, pady=(4, 6))
-                for i in range(2):
-                    chk_container.grid_columnconfigure(i, weight=1)
-                for i, cname in enumerate(cols_to_list):
-                    col = i % 2
-                    rowc = i // 2
-                    var = ctk.BooleanVar(value=(cname in self._metrics_settings.get("selected_cols", set())))
-                    def _make_cmd2(name=cname, v=var):
-                        return lambda: self._on_metrics_column_toggle(name, v.get())
-                    cb = ctk.CTkCheckBox(chk_container, text=cname, variable=var, command=_make_cmd2())
-                    cb.grid(row=rowc, column=col, sticky="w", padx=6, pady=2)
-            idx += 1
-
-    def _on_file_toggle(self, key: str, filename: str, is_selected: bool):
-        sel = self._selected_files.get(key, set())
-        if is_selected:
-            sel.add(filename)
-        else:
+                flatten_cb = ctk.CTkCheckBox(f, text="Flatten", variable=flatten_var, command=on_flatten_toggle)
+                flatten_cb.grid(row=0, column=0, sticky="w", padx=8, pady=4)
+            blocks.append(Block("flatten", bool(self._config_settings.get("flatten", False)), build_flatten))
+        # metrics DataFrame controls
+        if key == "metrics" and kind == "file":
+            blocks.extend(self._metrics_blocks(path, sheet))
+        return blocks
+
+    def _checklist_block(self, block_key: str, items: list[str], selected: set[str]) -> Block:
+        def build(f):
+            f.checklist = VirtualCheckList(f, on_change=self._notify_change)
+            f.checklist.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=6, pady=(4, 6))
+        return Block(block_key, "checklist", build, lambda f: f.checklist.set_items(items, selected))
+
+    def _build_raw_data_options(self, f):
+        # Send Minio checkbox
+        send_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("send_minio", True)))
+        def on_send_toggle():
+            self._raw_data_settings["send_minio"] = bool(send_var.get())
+            if callable(self.on_change):
+                self.on_change()
+        send_cb = ctk.CTkCheckBox(f, text="Send Minio", variable=send_var, command=on_send_toggle)
+        send_cb.grid(row=0, column=0, sticky="w", padx=8, pady=(6, 4))
+        # Save locally checkbox
+        save_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("save_locally", False)))
+        def on_save_toggle():
+            self._raw_data_settings["save_locally"] = bool(save_var.get())
+            try:
+                entry.configure(state=("normal" if save_var.get() else "disabled"))
+                btn.configure(state=("normal" if save_var.get() else "disabled"))
+            except Exception:
+                pass
+            if callable(self.on_change):
+                self.on_change()
+        save_cb = ctk.CTkCheckBox(f, text="Save locally", variable=save_var, command=on_save_toggle)
+        save_cb.grid(row=0, column=1, sticky="w", padx=8, pady=(6, 4))
+        # Path selector
+        def choose_path():
+            folder = filedialog.askdirectory()
+            if folder:
+                try:
+                    entry.delete(0, "end")
+                    entry.insert(0, folder)
+                except Exception:
+                    pass
+                self._raw_data_settings["local_path"] = folder
+                if callable(self.on_change):
+                    self.on_change()
+        ctk.CTkLabel(f, text="Local path").grid(row=1, column=0, sticky="w", padx=8, pady=4)
+        entry = ctk.CTkEntry(f, placeholder_text="Select a folder…")
+        entry.grid(row=1, column=1, sticky="ew", padx=(6, 8), pady=4)
+        if self._raw_data_settings.get("local_path"):
             try:
-                sel.remove(filename)
-            except KeyError:
+                entry.delete(0, "end")
+                entry.insert(0, self._raw_data_settings.get("local_path", ""))
+            except Exception:
                 pass
-        self._selected_files[key] = sel
+        btn = ctk.CTkButton(f, text="Browse…", width=90, command=choose_path)
+        btn.grid(row=2, column=1, sticky="e", padx=(6, 8), pady=(0, 6))
+        try:
+            entry.configure(state=("normal" if save_var.get() else "disabled"))
+            btn.configure(state=("normal" if save_var.get() else "disabled"))
+        except Exception:
+            pass
+        # Number of files uploaded to MinIO at once
+        def on_upload_workers_changed(value):
+            self._raw_data_settings["upload_workers"] = int(value)
+            if callable(self.on_change):
+                self.on_change()
+        ctk.CTkLabel(f, text="Parallel uploads").grid(row=3, column=0, sticky="w", padx=8, pady=4)
+        uploads_menu = ctk.CTkOptionMenu(f, values=["1", "2", "4", "8", "16"], dynamic_resizing=False,
+                                         command=on_upload_workers_changed)
+        uploads_menu.set(str(self._raw_data_settings.get("upload_workers", 4)))
+        uploads_menu.grid(row=3, column=1, sticky="ew", padx=(6, 8), pady=(0, 6))
+        # Skip objects already in the bucket with identical content
+        dedupe_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("dedupe", False)))
+        def on_dedupe_toggle():
+            self._raw_data_settings["dedupe"] = bool(dedupe_var.get())
+            if callable(self.on_change):
+                self.on_change()
+        ctk.CTkCheckBox(f, text="Skip identical objects", variable=dedupe_var, command=on_dedupe_toggle).grid(
+            row=4, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 6)
+        )
+        # How local copies are made (auto: reflink > hardlink > copy_file_range > copy)
+        def on_local_strategy_changed(value):
+            self._raw_data_settings["local_strategy"] = value or "auto"
+            if callable(self.on_change):
+                self.on_change()
+        ctk.CTkLabel(f, text="Local copy").grid(row=5, column=0, sticky="w", padx=8, pady=4)
+        strategy_menu = ctk.CTkOptionMenu(f, values=["auto", "reflink", "hardlink", "copy_file_range", "copy"],
+                                          dynamic_resizing=False, command=on_local_strategy_changed)
+        strategy_menu.set(self._raw_data_settings.get("local_strategy", "auto"))
+        strategy_menu.grid(row=5, column=1, sticky="ew", padx=(6, 8), pady=(0, 6))
+        # Compress MinIO uploads on the fly (files that do not shrink are sent as-is)
+        def on_compression_changed(value):
+            self._raw_data_settings["compression"] = "" if value == "none" else value
+            if callable(self.on_change):
+                self.on_change()
+        ctk.CTkLabel(f, text="Compression").grid(row=6, column=0, sticky="w", padx=8, pady=4)
+        compression_menu = ctk.CTkOptionMenu(f, values=["none", "gzip", "zstd"], dynamic_resizing=False,
+                                             command=on_compression_changed)
+        compression_menu.set(self._raw_data_settings.get("compression") or "none")
+        compression_menu.grid(row=6, column=1, sticky="ew", padx=(6, 8), pady=(0, 6))
+
+    def _build_artifacts_options(self, f):
+        def on_threshold_changed(_event=None):
+            try:
+                value = max(0.0, float(threshold_entry.get().strip() or 0))
+            except ValueError:
+                return
+            self._artifacts_settings["minio_threshold_mb"] = value
+            if callable(self.on_change):
+                self.on_change()
+        ctk.CTkLabel(f, text="MinIO above (MB)").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+        threshold_entry = ctk.CTkEntry(f, placeholder_text="0 = always GridFS")
+        threshold_entry.grid(row=0, column=1, sticky="ew", padx=(6, 8), pady=4)
+        if self._artifacts_settings.get("minio_threshold_mb"):
+            threshold_entry.insert(0, f"{self._artifacts_settings['minio_threshold_mb']:g}")
+        threshold_entry.bind("<FocusOut>", on_threshold_changed)
+        threshold_entry.bind("<Return>", on_threshold_changed)
+        # Reuse GridFS files already stored with the same content
+        reuse_var = ctk.BooleanVar(value=bool(self._artifacts_settings.get("content_addressed", False)))
+        def on_reuse_toggle():
+            self._artifacts_settings["content_addressed"] = bool(reuse_var.get())
+            if callable(self.on_change):
+                self.on_change()
+        ctk.CTkCheckBox(f, text="Reuse identical files", variable=reuse_var, command=on_reuse_toggle).grid(
+            row=1, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 2)
+        )
+        ctk.CTkLabel(
+            f,
+            text="Reused files are shared between runs: deleting one of those runs (e.g. in Omniboard) "
+                 "deletes the files for all of them. fs.files metadata.runs lists the runs using each file.",
+            text_color="gray", wraplength=420, justify="left", anchor="w",
+        ).grid(row=2, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 6))
+
+    def _metrics_blocks(self, path: Path, sheet: str) -> list[Block]:
+        col_names = self._metrics_columns(path, sheet)
+        if col_names is None:
+            def build_loading(f):
+                ctk.CTkLabel(f, text="Reading columns…").grid(row=0, column=0, columnspan=2, sticky="w", padx=8, pady=(6, 4))
+            return [Block("loading", None, build_loading)]
+        blocks: list[Block] = []
+        settings = self._metrics_settings
+        # defaults for selected columns: if nothing chosen yet, select all
+        if settings.get("selected_cols") is None:
+            settings["selected_cols"] = set(col_names)
+        current_cols = list(col_names)
+        if settings.get("has_time"):
+            if settings.get("time_col") not in current_cols:
+                settings["time_col"] = current_cols[0] if current_cols else ""
+
+        def build_flags(f):
+            # Header checkbox
+            header_var = ctk.BooleanVar(value=bool(settings.get("header", True)))
+            def on_header_toggle():
+                settings["header"] = bool(header_var.get())
+                # reset selected cols; they default to all columns once the new header is read
+                settings["selected_cols"] = None
+                self.render_details_sections()
+                if callable(self.on_change):
+                    self.on_change()
+            header_cb = ctk.CTkCheckBox(f, text="Column header", variable=header_var, command=on_header_toggle)
+            header_cb.grid(row=0, column=0, sticky="w", padx=8, pady=(6, 4))
+
+            # Time column checkbox
+            has_time_var = ctk.BooleanVar(value=bool(settings.get("has_time", False)))
+            def on_has_time_toggle():
+                settings["has_time"] = bool(has_time_var.get())
+                if not has_time_var.get():
+                    settings["time_col"] = ""
+                self.render_details_sections()
+                if callable(self.on_change):
+                    self.on_change()
+            time_cb = ctk.CTkCheckBox(f, text="x-axis column", variable=has_time_var, command=on_has_time_toggle)
+            time_cb.grid(row=0, column=1, sticky="w", padx=8, pady=(6, 4))
+        blocks.append(Block("metrics_flags", (bool(settings.get("header", True)), bool(settings.get("has_time", False))), build_flags))
+
+        estimate = self._metrics_rows_estimate
+        if estimate is not None:
+            def build_rows(f):
+                ctk.CTkLabel(f, text="Rows").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+                ctk.CTkLabel(f, text=f"~{estimate:,}").grid(row=0, column=1, sticky="w", padx=(6, 8), pady=4)
+            blocks.append(Block("rows", estimate, build_rows))
+        # Time column selector if enabled
+        if settings.get("has_time"):
+            time_col = settings.get("time_col", "")
+            def build_time(f):
+                time_menu = ctk.CTkOptionMenu(f, values=current_cols, dynamic_resizing=False,
+                                              command=lambda v: self._on_metrics_time_column_changed(v))
+                time_menu.set(time_col)
+                ctk.CTkLabel(f, text="x-axis column").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+                time_menu.grid(row=0, column=1, sticky="ew", padx=(6, 8), pady=4)
+            blocks.append(Block("time_col", (tuple(current_cols), time_col), build_time))
+
+        write_mode = settings.get("write_mode", "log_scalar")
+        columnar_store = settings.get("columnar_store", "gridfs")
+        def build_mode(f):
+            # Write mode: per-point log_scalar, bulk inserts into the metrics collection,
+            # or one compressed array per column (columnar)
+            ctk.CTkLabel(f, text="Write mode").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+            mode_menu = ctk.CTkOptionMenu(f, values=["log_scalar", "bulk", "columnar"], dynamic_resizing=False,
+                                          command=lambda v: self._on_metrics_write_mode_changed(v))
+            mode_menu.set(write_mode)
+            mode_menu.grid(row=0, column=1, sticky="ew", padx=(6, 8), pady=4)
+            if write_mode == "columnar":
+                ctk.CTkLabel(f, text="Array store").grid(row=1, column=0, sticky="w", padx=8, pady=4)
+                store_menu = ctk.CTkOptionMenu(f, values=["gridfs", "minio"], dynamic_resizing=False,
+                                               command=lambda v: self._on_metrics_columnar_store_changed(v))
+                store_menu.set(columnar_store)
+                store_menu.grid(row=1, column=1, sticky="ew", padx=(6, 8), pady=4)
+        blocks.append(Block("write_mode", (write_mode, columnar_store if write_mode == "columnar" else None), build_mode))
+
+        def build_options(f):
+            # Streaming: read the file in row chunks during the send (large files)
+            streaming_var = ctk.BooleanVar(value=bool(settings.get("streaming", False)))
+            def on_streaming_toggle():
+                settings["streaming"] = bool(streaming_var.get())
+                if callable(self.on_change):
+                    self.on_change()
+            ctk.CTkCheckBox(f, text="Stream large file", variable=streaming_var, command=on_streaming_toggle).grid(
+                row=0, column=0, columnspan=2, sticky="w", padx=8, pady=4
+            )
+            # Pyramid: also store min/max downsampled copies for fast plotting
+            pyramid_var = ctk.BooleanVar(value=bool(settings.get("pyramid", False)))
+            def on_pyramid_toggle():
+                settings["pyramid"] = bool(pyramid_var.get())
+                if callable(self.on_change):
+                    self.on_change()
+            ctk.CTkCheckBox(f, text="Downsampled levels", variable=pyramid_var, command=on_pyramid_toggle).grid(
+                row=1, column=0, columnspan=2, sticky="w", padx=8, pady=4
+            )
+        blocks.append(Block("metrics_options", (bool(settings.get("streaming", False)), bool(settings.get("pyramid", False))), build_options))
+
+        # Columns checklist (exclude time column if set)
+        cols_to_list = [c for c in current_cols if c != settings.get("time_col", "")]
+        blocks.append(self._checklist_block("columns", cols_to_list, settings["selected_cols"]))
+        return blocks
+
+    def _notify_change(self):
         if callable(self.on_change):
             self.on_change()
 
     # --- Metrics helpers ---
-    def _read_tabular(self, path: Path, sheet: str) -> tuple[list[str], list[list[object]]]:
-        cols: list[str] = []
-        rows: list[list[object]] = []
+    def _metrics_columns(self, path: Path, sheet: str) -> list[str] | None:
+        """Column names of the metrics file, or None while they are being read.
+
+        Known files are answered from the workbook metadata cache; otherwise
+        only the header and the first rows are read, in the background, and
+        the cards are rendered again when the result arrives.
+        """
+        header = bool(self._metrics_settings.get("header", True))
+        sep = self._csv_separators.get("metrics", ",")
+        cached = self._workbook_meta.columns(path, sheet, header, sep)
+        if cached is not None:
+            self._metrics_rows_estimate = cached[1]
+            return cached[0]
         try:
-            if path.suffix.lower() in (".xlsx", ".xlsm"):
-                wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-                ws = None
-                if sheet and sheet in wb.sheetnames:
-                    ws = wb[sheet]
-                else:
-                    ws = wb[wb.sheetnames[0]]
-                data_iter = ws.iter_rows(values_only=True)
-                for i, row in enumerate(data_iter):
-                    if i == 0 and bool(self._metrics_settings.get("header", True)):
-                        cols = [str(c) if c is not None else f"col{idx}" for idx, c in enumerate(list(row))]
-                    else:
-                        rows.append(list(row))
-                wb.close()
-                # if no header, generate from max row length
-                if not cols:
-                    max_len = max((len(r) for r in rows), default=0)
-                    cols = [str(i) for i in range(max_len)]
-            elif path.suffix.lower() == ".csv":
-                # Use selected separator for metrics preview
-                sep = self._csv_separators.get("metrics", ",")
-                with open(path, newline="", encoding="utf-8") as f:
-                    reader = csv.reader(f, delimiter=("\t" if sep == "\t" else sep))
-                    for i, row in enumerate(reader):
-                        if i == 0 and bool(self._metrics_settings.get("header", True)):
-                            cols = [str(c) for c in row]
-                        else:
-                            rows.append(row)
-                if not cols:
-                    max_len = max((len(r) for r in rows), default=0)
-                    cols = [str(i) for i in range(max_len)]
-            else:
-                # unsupported -> empty
-                cols, rows = [], []
-        except Exception as e:
-            try:
-                self.status.configure(text=f"Error reading metrics: {e}")
-            except Exception:
-                pass
-        return cols, rows
+            st = path.stat()
+        except OSError as e:
+            self.status.configure(text=f"Error reading metrics: {e}")
+            return []
+        signature = (str(path), st.st_mtime_ns, st.st_size, sheet, header, sep)
+        if self._metrics_preview and self._metrics_preview[0] == signature:
+            result = self._metrics_preview[1]
+            if isinstance(result, Exception):
+                try:
+                    self.status.configure(text=f"Error reading metrics: {result}")
+                except Exception:
+                    pass
+                return []
+            self._metrics_rows_estimate = result[2]
+            return list(result[0])
+        self._previews.request(
+            ("columns", "metrics"),
+            signature,
+            lambda cancel: read_tabular_preview(path, sheet, header, sep, cancel=cancel),
+            lambda result: self._on_metrics_preview(signature, result),
+        )
+        return None
+
+    def _on_metrics_preview(self, signature: tuple, result):
+        self._metrics_preview = (signature, result)
+        if not isinstance(result, Exception):
+            path, mtime_ns, size, sheet, header, sep = signature
+            self._workbook_meta.put_columns(Path(path), sheet, header, sep, result[0], result[2], read_stamp=(size, mtime_ns))
+            self._workbook_meta.save()
+            # if time col no longer exists, reset
+            if self._metrics_settings.get("time_col") not in result[0]:
+                self._metrics_settings["time_col"] = ""
+        self.render_details_sections()
+        if callable(self.on_change):
+            self.on_change()
 
     def _on_sep_changed(self, key: str, display_value: str):
         sep = "\t" if display_value == "\\t" else display_value
@@ -695,24 +1003,18 @@ class ExperimentSection(ctk.CTkFrame):
 
     def _on_metrics_time_column_changed(self, col_name: str):
         self._metrics_settings["time_col"] = col_name or ""
-        if col_name:
-            # ensure selected cols include all except time col if none set
-            if not self._metrics_settings.get("selected_cols"):
-                self._metrics_settings["selected_cols"] = set()
         self.render_details_sections()
         if callable(self.on_change):
             self.on_change()
 
-    def _on_metrics_column_toggle(self, col_name: str, is_selected: bool):
-        sel = self._metrics_settings.get("selected_cols", set())
-        if is_selected:
-            sel.add(col_name)
-        else:
-            try:
-                sel.remove(col_name)
-            except KeyError:
-                pass
-        self._metrics_settings["selected_cols"] = sel
+    def _on_metrics_write_mode_changed(self, mode: str):
+        self._metrics_settings["write_mode"] = mode or "log_scalar"
+        # the array store menu only applies to columnar mode
+        self.render_details_sections()
         if callable(self.on_change):
             self.on_change()
 
+    def _on_metrics_columnar_store_changed(self, store: str):
+        self._metrics_settings["columnar_store"] = store or "gridfs"
+        if callable(self.on_change):
+            self.on_change()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+from openpyxl import load_workbook
+
+from services.prefs import STATE_DIR
+
+PREVIEW_ROWS = 20
+META_CACHE_ENTRIES = 256
+
+
+class PreviewCancelled(Exception):
+    pass
+
+
+def _check(cancel: threading.Event | None):
+    if cancel is not None and cancel.is_set():
+        raise PreviewCancelled()
+
+
+def read_sheet_names(path: Path, cancel: threading.Event | None = None) -> list[str]:
+    wb = load_workbook(filename=str(path), read_only=True, data_only=True)
+    try:
+        _check(cancel)
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_tabular_preview(
+    path: Path,
+    sheet: str,
+    header: bool,
+    sep: str = ",",
+    max_rows: int = PREVIEW_ROWS,
+    cancel: threading.Event | None = None,
+) -> tuple[list[str], list[list[object]], int | None]:
+    """Column names, the first ``max_rows`` rows and an estimated row count.
+
+    Only the start of the file is read, whatever its size: the count comes
+    from the sheet dimension for workbooks and from the average length of
+    the previewed lines for CSV files (None when unknown).
+    """
+    cols: list[str] = []
+    rows: list[list[object]] = []
+    estimate: int | None = None
+    if path.suffix.lower() in (".xlsx", ".xlsm"):
+        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if sheet and sheet in wb.sheetnames else wb[wb.sheetnames[0]]
+            try:
+                if ws.max_row:
+                    estimate = max(0, int(ws.max_row) - (1 if header else 0))
+            except Exception:
+                estimate = None
+            for i, row in enumerate(ws.iter_rows(values_only=True)):
+                _check(cancel)
+                if i == 0 and header:
+                    cols = [str(c) if c is not None else f"col{idx}" for idx, c in enumerate(list(row))]
+                else:
+                    rows.append(list(row))
+                if len(rows) >= max_rows:
+                    break
+        finally:
+            wb.close()
+    elif path.suffix.lower() == ".csv":
+        line_bytes = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f, delimiter=("\t" if sep == "\t" else sep))
+            for i, row in enumerate(reader):
+                _check(cancel)
+                line_bytes += len(sep.join(row).encode("utf-8")) + 1
+                if i == 0 and header:
+                    cols = [str(c) for c in row]
+                else:
+                    rows.append(row)
+                if len(rows) >= max_rows:
+                    break
+            complete = len(rows) < max_rows
+        if complete:
+            estimate = len(rows)
+        elif line_bytes:
+            estimate = int(path.stat().st_size * (len(rows) + (1 if header else 0)) / line_bytes) - (1 if header else 0)
+    else:
+        return [], [], None
+    # if no header, generate from max row length
+    if not cols:
+        max_len = max((len(r) for r in rows), default=0)
+        cols = [str(i) for i in range(max_len)]
+    return cols, rows, estimate
+
+
+class WorkbookMetaCache:
+    """Sheet names, column headers and row estimates of previewed files.
+
+    Entries are keyed by absolute path and dropped as soon as the file's
+    size or mtime changes. The cache is kept in STATE_DIR so it survives
+    restarts; only the ``META_CACHE_ENTRIES`` most recently used files are
+    kept. Lookups and updates are thread-safe.
+    """
+
+    def __init__(self, path=None, max_entries: int = META_CACHE_ENTRIES):
+        self.path = path or STATE_DIR / "workbook_meta.json"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            self.entries: dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _columns_key(sheet: str, header: bool, sep: str) -> str:
+        return json.dumps([sheet or "", bool(header), sep])
+
+    def _entry(self, path: Path, create: bool = False, read_stamp: tuple | None = None) -> dict | None:
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None
+        stamp = [st.st_size, st.st_mtime_ns]
+        if read_stamp is not None and list(read_stamp) != stamp:
+            return None  # file changed since it was read
+        entry = self.entries.get(key)
+        if entry is None or entry.get("stat") != stamp:
+            if not create:
+                return None
+            entry = self.entries[key] = {"stat": stamp, "sheets": None, "columns": {}}
+        entry["used"] = time.time()
+        return entry
+
+    def sheets(self, path: Path) -> list[str] | None:
+        with self._lock:
+            entry = self._entry(path)
+            return list(entry["sheets"]) if entry and entry.get("sheets") is not None else None
+
+    def put_sheets(self, path: Path, sheets: list[str], read_stamp: tuple | None = None) -> None:
+        with self._lock:
+            entry = self._entry(path, create=True, read_stamp=read_stamp)
+            if entry is not None:
+                entry["sheets"] = list(sheets)
+                self._dirty = True
+
+    def columns(self, path: Path, sheet: str, header: bool, sep: str) -> tuple[list[str], int | None] | None:
+        """(column names, estimated rows) or None when not cached."""
+        with self._lock:
+            entry = self._entry(path)
+            hit = entry["columns"].get(self._columns_key(sheet, header, sep)) if entry else None
+            return (list(hit["names"]), hit.get("rows")) if hit else None
+
+    def put_columns(
+        self, path: Path, sheet: str, header: bool, sep: str, names: list[str], rows: int | None, read_stamp: tuple | None = None
+    ) -> None:
+        """Store a header read while the file had ``read_stamp`` (size, mtime_ns)."""
+        with self._lock:
+            entry = self._entry(path, create=True, read_stamp=read_stamp)
+            if entry is not None:
+                entry["columns"][self._columns_key(sheet, header, sep)] = {"names": list(names), "rows": rows}
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            if len(self.entries) > self.max_entries:
+                recent = sorted(self.entries.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)
+                self.entries = dict(recent[: self.max_entries])
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self.entries), encoding="utf-8")
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"Could not save workbook metadata cache: {e}")
+                return
+            self._dirty = False
+
+
+class PreviewLoader:
+    """Run preview reads off the Tk thread, one live request per key.
+
+    ``request`` starts ``fn(cancel_event)`` in a worker thread; a newer
+    request for the same key cancels the previous one. Results are collected
+    on the Tk thread by an ``after()`` poll and handed to ``on_done`` only if
+    the request is still the current one for its key. ``on_done`` receives
+    the value returned by ``fn`` or the exception it raised.
+    """
+
+    def __init__(self, widget, poll_ms: int = 50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._pending: dict[Hashable, tuple[Hashable, threading.Event, Callable[[Any], None]]] = {}
+        self._results: "queue.Queue[tuple[Hashable, Hashable, Any]]" = queue.Queue()
+        self._polling = False
+
+    def is_loading(self, key: Hashable, signature: Hashable) -> bool:
+        current = self._pending.get(key)
+        return current is not None and current[0] == signature
+
+    def request(self, key: Hashable, signature: Hashable, fn: Callable[[threading.Event], Any], on_done: Callable[[Any], None]) -> None:
+        if self.is_loading(key, signature):
+            return
+        self.cancel(key)
+        cancel = threading.Event()
+        self._pending[key] = (signature, cancel, on_done)
+        threading.Thread(target=self._run, args=(key, signature, fn, cancel), daemon=True, name=f"preview-{key}").start()
+        self._schedule()
+
+    def cancel(self, key: Hashable) -> None:
+        current = self._pending.pop(key, None)
+        if current is not None:
+            current[1].set()
+
+    def _run(self, key, signature, fn, cancel: threading.Event) -> None:
+        try:
+            result = fn(cancel)
+        except PreviewCancelled:
+            return
+        except Exception as e:
+            result = e
+        self._results.put((key, signature, result))
+
+    def _schedule(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._polling = False
+        while True:
+            try:
+                key, signature, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            current = self._pending.get(key)
+            if current is None or current[0] != signature or current[1].is_set():
+                continue  # superseded or cancelled
+            del self._pending[key]
+            try:
+                current[2](result)
+            except Exception as e:
+                print(f"Preview callback failed: {e}")
+        if self._pending:
+            self._schedule()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable, Iterable, NamedTuple, Optional
+
+import customtkinter as ctk
+
+# width of the label column shared by the blocks of a card
+LABEL_MINSIZE = 120
+
+
+class Block(NamedTuple):
+    """One row group of a card.
+
+    ``build(frame)`` lays out the block's widgets in an empty frame; it runs
+    again only when ``spec`` (the state the widgets were built from)
+    changes. ``update(frame)``, if given, runs on every render to refresh
+    widgets in place.
+    """
+
+    key: Hashable
+    spec: Any
+    build: Callable[[ctk.CTkFrame], None]
+    update: Optional[Callable[[ctk.CTkFrame], None]] = None
+
+
+def reconcile_blocks(parent, blocks: Iterable[Block], store: dict) -> None:
+    """Bring ``parent``'s rows in line with ``blocks``, rebuilding only what changed.
+
+    ``store`` ({key: (spec, frame)}) is owned by the caller and kept between
+    renders. Blocks with an unchanged spec keep their widgets and are only
+    moved to their new row; blocks no longer listed are destroyed.
+    """
+    seen = set()
+    for row, block in enumerate(blocks):
+        seen.add(block.key)
+        current = store.get(block.key)
+        if current is not None and current[0] == block.spec:
+            frame = current[1]
+            frame.grid_configure(row=row)
+        else:
+            if current is not None:
+                current[1].destroy()
+            frame = ctk.CTkFrame(parent, fg_color="transparent")
+            frame.grid(row=row, column=0, sticky="ew")
+            frame.grid_columnconfigure(0, minsize=LABEL_MINSIZE)
+            frame.grid_columnconfigure(1, weight=1)
+            block.build(frame)
+            store[block.key] = (block.spec, frame)
+        if block.update is not None:
+            block.update(frame)
+    for key in [k for k in store if k not in seen]:
+        try:
+            store.pop(key)[1].destroy()
+        except Exception:
+            pass
+
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from typing import Callable, Iterable, Optional
+
+import customtkinter as ctk
+
+FILTER_DELAY_MS = 150
+WHEEL_ROWS = 3
+
+
+def item_matcher(text: str) -> Optional[Callable[[str], bool]]:
+    """Predicate for a filter string, or None to show everything.
+
+    ``re:<pattern>`` is a regular expression, text containing ``*``, ``?``
+    or ``[`` is a glob, anything else a substring; all case-insensitive.
+    Raises ``re.error`` for an invalid regular expression.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    if text.startswith("re:"):
+        rx = re.compile(text[3:], re.IGNORECASE)
+        return lambda name: rx.search(name) is not None
+    if any(ch in text for ch in "*?["):
+        pattern = text.lower()
+        return lambda name: fnmatch.fnmatchcase(name.lower(), pattern)
+    needle = text.lower()
+    return lambda name: needle in name.lower()
+
+
+class VirtualCheckList(ctk.CTkFrame):
+    """Scrollable, filterable checklist that only creates widgets for visible rows.
+
+    A fixed pool of ``rows`` checkboxes is rebound to the items under the
+    scroll position, so the widget count does not grow with the list.
+    Selection lives in the plain set given to ``set_items``, which is
+    updated in place; ``on_change()`` is called after every user change.
+    "All" / "None" apply to the items matching the filter, which accepts
+    text, a glob or ``re:<regex>``.
+    """
+
+    def __init__(self, master, on_change: Optional[Callable[[], None]] = None, rows: int = 10, **kwargs):
+        super().__init__(master, corner_radius=8, **kwargs)
+        self.on_change = on_change
+        self.rows = rows
+        self.items: list[str] = []
+        self.selected: set[str] = set()
+        self._item_set: set[str] = set()
+        self._shown: list[str] = []
+        self._offset = 0
+        self._filter_job = None
+        self._filter_error = ""
+        self.grid_columnconfigure(0, weight=1)
+
+        bar = ctk.CTkFrame(self, fg_color="transparent")
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew", padx=4, pady=(4, 2))
+        bar.grid_columnconfigure(0, weight=1)
+        self.filter_entry = ctk.CTkEntry(bar, placeholder_text="Filter: text, glob (*.csv) or re:regex")
+        self.filter_entry.grid(row=0, column=0, sticky="ew")
+        self.filter_entry.bind("<KeyRelease>", self._on_filter_typed)
+        ctk.CTkButton(bar, text="All", width=48, command=lambda: self.select_shown(True)).grid(row=0, column=1, padx=(4, 0))
+        ctk.CTkButton(bar, text="None", width=48, command=lambda: self.select_shown(False)).grid(row=0, column=2, padx=(4, 0))
+        self.count_label = ctk.CTkLabel(bar, text="", anchor="w")
+        self.count_label.grid(row=1, column=0, columnspan=3, sticky="w")
+
+        self._vars: list[ctk.BooleanVar] = []
+        self._boxes: list[ctk.CTkCheckBox] = []
+        for i in range(rows):
+            var = ctk.BooleanVar(value=False)
+            cb = ctk.CTkCheckBox(self, text="", variable=var, command=lambda i=i: self._on_box(i))
+            self._bind_wheel(cb)
+            self._vars.append(var)
+            self._boxes.append(cb)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, rowspan=rows, sticky="ns", padx=(0, 4), pady=2)
+        self._bind_wheel(self)
+
+    # --- data ---
+    def set_items(self, items: Iterable[str], selected: set[str]) -> None:
+        """Show ``items``; ``selected`` is used (and modified) as the selection."""
+        items = list(items)
+        self.selected = selected
+        if items != self.items:
+            self.items = items
+            self._item_set = set(items)
+            self._apply_filter(keep_offset=True)
+        else:
+            self._refresh()
+
+    def select_shown(self, checked: bool) -> None:
+        if checked:
+            self.selected.update(self._shown)
+        else:
+            self.selected.difference_update(self._shown)
+        self._refresh()
+        self._notify()
+
+    # --- filtering ---
+    def _on_filter_typed(self, _event=None):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self, keep_offset: bool = False) -> None:
+        self._filter_job = None
+        self._filter_error = ""
+        try:
+            matcher = item_matcher(self.filter_entry.get())
+            self._shown = self.items if matcher is None else [n for n in self.items if matcher(n)]
+        except re.error as e:
+            self._shown = []
+            self._filter_error = f"invalid regex: {e}"
+        if not keep_offset:
+            self._offset = 0
+        self._scroll_to(self._offset)
+
+    # --- scrolling ---
+    def _scroll_to(self, offset: int) -> None:
+        self._offset = max(0, min(int(offset), len(self._shown) - self.rows))
+        self._refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(round(float(value) * len(self._shown)))
+        elif action == "scroll":
+            step = self.rows if unit == "pages" else 1
+            self._scroll_to(self._offset + int(value) * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_to(self._offset - WHEEL_ROWS)
+        else:
+            self._scroll_to(self._offset + WHEEL_ROWS)
+        return "break"
+
+    def _bind_wheel(self, widget) -> None:
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(sequence, self._on_wheel, add="+")
+
+    # --- rows ---
+    def _refresh(self) -> None:
+        for i, (cb, var) in enumerate(zip(self._boxes, self._vars)):
+            idx = self._offset + i
+            if idx < len(self._shown):
+                name = self._shown[idx]
+                cb.configure(text=name)
+                var.set(name in self.selected)
+                cb.grid(row=1 + i, column=0, sticky="w", padx=6, pady=2)
+            else:
+                cb.grid_remove()
+        total = len(self._shown)
+        if total > self.rows:
+            self.scrollbar.set(self._offset / total, (self._offset + self.rows) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        count = len(self._item_set.intersection(self.selected))
+        text = f"{count} of {len(self.items)} selected"
+        if total != len(self.items):
+            text += f" · {total} shown"
+        if self._filter_error:
+            text += f" · {self._filter_error}"
+        self.count_label.configure(text=text)
+
+    def _on_box(self, i: int) -> None:
+        idx = self._offset + i
+        if idx >= len(self._shown):
+            return
+        name = self._shown[idx]
+        if self._vars[i].get():
+            self.selected.add(name)
+        else:
+            self.selected.discard(name)
+        self._refresh()
+        self._notify()
+
+    def _notify(self) -> None:
+        if callable(self.on_change):
+            self.on_change()